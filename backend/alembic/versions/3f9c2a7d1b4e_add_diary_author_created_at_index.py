@@ -0,0 +1,31 @@
+"""Add (author_id, created_at) index on diaries
+
+Revision ID: 3f9c2a7d1b4e
+Revises: 67dd5d33d84e
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1b4e'
+down_revision: Union[str, None] = '67dd5d33d84e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_diaries_author_id_created_at',
+        'diaries',
+        ['author_id', 'created_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_diaries_author_id_created_at', table_name='diaries')
@@ -0,0 +1,65 @@
+"""Add logical diary_date to diaries
+
+Stores the diary day (6 AM cutoff applied) once at insert time and
+enforces one diary per author and day with a unique index.
+
+Existing rows are backfilled from created_at. If two old diaries of the
+same author land on the same logical day, the later one keeps its
+calendar date instead, which is what the old created_at-based views
+showed for it.
+
+Revision ID: 8b1e4f0c6a2d
+Revises: 3f9c2a7d1b4e
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e4f0c6a2d'
+down_revision: Union[str, None] = '3f9c2a7d1b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('diaries', sa.Column('diary_date', sa.Date(), nullable=True))
+
+    if op.get_bind().dialect.name == 'sqlite':
+        shifted_date = "date(created_at, '-6 hours')"
+        calendar_date = "date(diaries.created_at)"
+    else:
+        shifted_date = "CAST(created_at - INTERVAL '6 hours' AS DATE)"
+        calendar_date = "CAST(diaries.created_at AS DATE)"
+
+    op.execute(f"UPDATE diaries SET diary_date = {shifted_date}")
+    op.execute(f"""
+        UPDATE diaries SET diary_date = {calendar_date}
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY author_id, diary_date ORDER BY created_at, id
+                ) AS rn
+                FROM diaries
+            ) ranked
+            WHERE ranked.rn > 1
+        )
+    """)
+
+    with op.batch_alter_table('diaries') as batch_op:
+        batch_op.alter_column('diary_date', existing_type=sa.Date(), nullable=False)
+    op.create_index(
+        'uq_diaries_author_id_diary_date',
+        'diaries',
+        ['author_id', 'diary_date'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_diaries_author_id_diary_date', table_name='diaries')
+    op.drop_column('diaries', 'diary_date')
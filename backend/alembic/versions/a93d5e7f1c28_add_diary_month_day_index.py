@@ -0,0 +1,34 @@
+"""Add month/day expression index on diaries
+
+Backs the "on this day" memories lookup and the daily memories push.
+
+Revision ID: a93d5e7f1c28
+Revises: f18a3c6e2b57
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93d5e7f1c28'
+down_revision: Union[str, None] = 'f18a3c6e2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    diary_date = sa.column('diary_date', sa.Date())
+    op.create_index(
+        'ix_diaries_month_day_author_id',
+        'diaries',
+        [sa.extract('month', diary_date), sa.extract('day', diary_date), 'author_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_diaries_month_day_author_id', table_name='diaries')
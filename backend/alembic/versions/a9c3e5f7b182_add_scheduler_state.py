@@ -0,0 +1,34 @@
+"""Add scheduler_state
+
+Keeps the reminder catch-up watermark in the database, so a new
+scheduler leader does not resend minutes the previous one covered.
+
+Revision ID: a9c3e5f7b182
+Revises: e7b2d4f9a061
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e5f7b182'
+down_revision: Union[str, None] = 'e7b2d4f9a061'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scheduler_state',
+        sa.Column('job', sa.String(length=64), nullable=False),
+        sa.Column('due_from', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scheduler_state')
@@ -0,0 +1,67 @@
+"""Add updated_at columns and tombstones for the /sync change feed
+
+Existing rows take their created_at (or the migration time where there is
+none) so the first sync after upgrading still sees them.
+
+Revision ID: b4c8e2a7d610
+Revises: a93d5e7f1c28
+Create Date: 2026-10-18 11:10:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c8e2a7d610'
+down_revision: Union[str, None] = 'a93d5e7f1c28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    now = datetime.utcnow()
+    for table in ('diary_photos', 'monthly_photos', 'anniversaries'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    for table in ('diaries', 'diary_photos', 'monthly_photos'):
+        op.execute(sa.text(
+            f"UPDATE {table} SET updated_at = COALESCE(created_at, :now) WHERE updated_at IS NULL"
+        ).bindparams(now=now))
+    op.execute(sa.text("UPDATE anniversaries SET updated_at = :now").bindparams(now=now))
+
+    op.create_index('ix_diaries_author_id_updated_at_id', 'diaries', ['author_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_diary_photos_updated_at_id', 'diary_photos', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_monthly_photos_couple_id_updated_at_id', 'monthly_photos', ['couple_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_anniversaries_updated_at_id', 'anniversaries', ['updated_at', 'id'], unique=False)
+
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tombstones_id'), 'sync_tombstones', ['id'], unique=False)
+    op.create_index('ix_sync_tombstones_user_id_deleted_at_id', 'sync_tombstones', ['user_id', 'deleted_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_tombstones_user_id_deleted_at_id', table_name='sync_tombstones')
+    op.drop_index(op.f('ix_sync_tombstones_id'), table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+
+    op.drop_index('ix_anniversaries_updated_at_id', table_name='anniversaries')
+    op.drop_index('ix_monthly_photos_couple_id_updated_at_id', table_name='monthly_photos')
+    op.drop_index('ix_diary_photos_updated_at_id', table_name='diary_photos')
+    op.drop_index('ix_diaries_author_id_updated_at_id', table_name='diaries')
+    for table in ('anniversaries', 'monthly_photos', 'diary_photos'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
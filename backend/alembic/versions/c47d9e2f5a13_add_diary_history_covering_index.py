@@ -0,0 +1,52 @@
+"""Add covering index for diary history pages
+
+Replaces ix_diaries_author_id_created_at with an (author_id, created_at,
+id) index that includes title and diary_date on Postgres, so keyset
+pages of /diary/my summaries are answered index-only. Also makes sure
+diary_photos.diary_id is indexed on databases that never ran
+migrations/add_diary_photos_table.sql.
+
+Revision ID: c47d9e2f5a13
+Revises: 8b1e4f0c6a2d
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47d9e2f5a13'
+down_revision: Union[str, None] = '8b1e4f0c6a2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_diaries_author_id_created_at_id',
+        'diaries',
+        ['author_id', 'created_at', 'id'],
+        unique=False,
+        postgresql_include=['title', 'diary_date'],
+    )
+    op.drop_index('ix_diaries_author_id_created_at', table_name='diaries')
+    op.create_index(
+        'idx_diary_photos_diary_id',
+        'diary_photos',
+        ['diary_id'],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_diaries_author_id_created_at',
+        'diaries',
+        ['author_id', 'created_at'],
+        unique=False,
+    )
+    op.drop_index('ix_diaries_author_id_created_at_id', table_name='diaries')
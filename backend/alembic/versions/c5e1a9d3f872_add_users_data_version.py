@@ -0,0 +1,30 @@
+"""Add users.data_version for conditional GETs
+
+Calendar and day views combine both partners' versions into their ETag.
+NULL counts as a version of its own, so existing users need no backfill.
+
+Revision ID: c5e1a9d3f872
+Revises: b4c8e2a7d610
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1a9d3f872'
+down_revision: Union[str, None] = 'b4c8e2a7d610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_version')
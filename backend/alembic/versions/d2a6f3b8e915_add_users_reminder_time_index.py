@@ -0,0 +1,32 @@
+"""Add partial index on users.reminder_time
+
+Revision ID: d2a6f3b8e915
+Revises: c47d9e2f5a13
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a6f3b8e915'
+down_revision: Union[str, None] = 'c47d9e2f5a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_users_reminder_time',
+        'users',
+        ['reminder_time'],
+        unique=False,
+        postgresql_where=sa.text('reminder_time IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_reminder_time', table_name='users')
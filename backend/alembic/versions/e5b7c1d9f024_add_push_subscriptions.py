@@ -0,0 +1,89 @@
+"""Move push subscriptions into their own table
+
+Users can register several devices. Each existing users.push_subscription
+becomes one row, and the column is dropped afterwards.
+
+Revision ID: e5b7c1d9f024
+Revises: d2a6f3b8e915
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c1d9f024'
+down_revision: Union[str, None] = 'd2a6f3b8e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    push_subscriptions = op.create_table(
+        'push_subscriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('endpoint_hash', sa.String(length=64), nullable=False),
+        sa.Column('endpoint', sa.String(), nullable=False),
+        sa.Column('subscription_info', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_success_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_push_subscriptions_id'), 'push_subscriptions', ['id'], unique=False)
+    op.create_index('ix_push_subscriptions_user_id', 'push_subscriptions', ['user_id'], unique=False)
+    op.create_index('uq_push_subscriptions_endpoint_hash', 'push_subscriptions', ['endpoint_hash'], unique=True)
+
+    rows = []
+    seen = set()
+    now = datetime.utcnow()
+    # A browser shared by several accounts belongs to whoever registered it last
+    result = op.get_bind().execute(sa.text(
+        "SELECT id, push_subscription FROM users WHERE push_subscription IS NOT NULL ORDER BY id DESC"
+    ))
+    for user_id, subscription_info in result:
+        try:
+            endpoint = json.loads(subscription_info)['endpoint']
+        except (TypeError, ValueError, KeyError):
+            continue
+        endpoint_hash = hashlib.sha256(endpoint.encode()).hexdigest()
+        if endpoint_hash in seen:
+            continue
+        seen.add(endpoint_hash)
+        rows.append({
+            'user_id': user_id,
+            'endpoint_hash': endpoint_hash,
+            'endpoint': endpoint,
+            'subscription_info': subscription_info,
+            'created_at': now,
+        })
+    if rows:
+        op.bulk_insert(push_subscriptions, rows)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('push_subscription')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('push_subscription', sa.String(), nullable=True))
+    # Keep the most recently registered device per user
+    op.execute("""
+        UPDATE users SET push_subscription = (
+            SELECT subscription_info FROM push_subscriptions
+            WHERE push_subscriptions.user_id = users.id
+            ORDER BY push_subscriptions.id DESC
+            LIMIT 1
+        )
+    """)
+    op.drop_index('uq_push_subscriptions_endpoint_hash', table_name='push_subscriptions')
+    op.drop_index('ix_push_subscriptions_user_id', table_name='push_subscriptions')
+    op.drop_index(op.f('ix_push_subscriptions_id'), table_name='push_subscriptions')
+    op.drop_table('push_subscriptions')
@@ -0,0 +1,33 @@
+"""Add variants to diary_photos and monthly_photos
+
+Resized WebP copies of each photo; existing rows stay NULL until
+backfill_photo_variants.py has processed them.
+
+Revision ID: e7b2d4f9a061
+Revises: c5e1a9d3f872
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2d4f9a061'
+down_revision: Union[str, None] = 'c5e1a9d3f872'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('diary_photos', sa.Column('variants', sa.JSON(), nullable=True))
+    op.add_column('monthly_photos', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('monthly_photos') as batch_op:
+        batch_op.drop_column('variants')
+    with op.batch_alter_table('diary_photos') as batch_op:
+        batch_op.drop_column('variants')
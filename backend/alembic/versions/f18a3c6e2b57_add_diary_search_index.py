@@ -0,0 +1,69 @@
+"""Add full-text search index on diaries
+
+Postgres gets a generated search_vector column with a GIN index; SQLite
+gets an external-content FTS5 table kept in sync by triggers, rebuilt
+from the existing rows.
+
+Revision ID: f18a3c6e2b57
+Revises: e5b7c1d9f024
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f18a3c6e2b57'
+down_revision: Union[str, None] = 'e5b7c1d9f024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE diaries ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_diaries_search_vector ON diaries USING GIN (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE diaries_fts USING fts5(
+                title, content, content='diaries', content_rowid='id'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER diaries_fts_ai AFTER INSERT ON diaries BEGIN
+                INSERT INTO diaries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER diaries_fts_ad AFTER DELETE ON diaries BEGIN
+                INSERT INTO diaries_fts(diaries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER diaries_fts_au AFTER UPDATE OF title, content ON diaries BEGIN
+                INSERT INTO diaries_fts(diaries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO diaries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END
+        """)
+        op.execute("INSERT INTO diaries_fts(diaries_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_diaries_search_vector")
+        op.execute("ALTER TABLE diaries DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS diaries_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS diaries_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS diaries_fts_ai")
+        op.execute("DROP TABLE IF EXISTS diaries_fts")
@@ -1,36 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import date
 from app.db.database import get_db
 from app.models.anniversary import Anniversary as AnniversaryModel
-from app.models.user import User
 from app.schemas.anniversary import Anniversary, AnniversaryCreate, AnniversaryUpdate
-from app.api.deps import get_current_user
+from app.api.deps import CurrentUser, MonthPath, YearPath, get_current_user, couple_etag, bump_data_version
+from app.services import events, sync
+from app.services.events import event_hub
 
 router = APIRouter()
 
 @router.post("/", response_model=Anniversary)
-def create_or_update_anniversary(
+async def create_or_update_anniversary(
     anniversary: AnniversaryCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     if not current_user.partner_id:
         raise HTTPException(status_code=400, detail="No partner connected")
     
     # Check if anniversary already exists for this date
-    existing = db.query(AnniversaryModel).filter(
+    result = await db.execute(select(AnniversaryModel).where(
         ((AnniversaryModel.user_id == current_user.id) & (AnniversaryModel.partner_id == current_user.partner_id)) |
         ((AnniversaryModel.user_id == current_user.partner_id) & (AnniversaryModel.partner_id == current_user.id)),
         AnniversaryModel.date == anniversary.date
-    ).first()
+    ))
+    existing = result.scalars().first()
     
     if existing:
         # Update existing anniversary
         existing.name = anniversary.name
-        db.commit()
-        db.refresh(existing)
+        await bump_data_version(db, current_user.id)
+        await db.commit()
+        await db.refresh(existing)
+        _publish_anniversary(events.ANNIVERSARY_UPDATED, existing)
         return existing
     
     # Create new anniversary
@@ -41,47 +46,49 @@ def create_or_update_anniversary(
         name=anniversary.name
     )
     db.add(db_anniversary)
-    db.commit()
-    db.refresh(db_anniversary)
+    await bump_data_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(db_anniversary)
+    _publish_anniversary(events.ANNIVERSARY_UPDATED, db_anniversary)
     
     return db_anniversary
 
 @router.get("/", response_model=List[Anniversary])
-def get_anniversaries(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_anniversaries(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     if not current_user.partner_id:
         return []
     
-    anniversaries = db.query(AnniversaryModel).filter(
-        ((AnniversaryModel.user_id == current_user.id) & (AnniversaryModel.partner_id == current_user.partner_id)) |
-        ((AnniversaryModel.user_id == current_user.partner_id) & (AnniversaryModel.partner_id == current_user.id))
-    ).all()
-    
-    return anniversaries
+    return await get_couple_anniversaries(db, current_user.id, current_user.partner_id)
 
-@router.get("/month/{year}/{month}")
-def get_month_anniversaries(
-    year: int,
-    month: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/month/{year}/{month}", dependencies=[Depends(couple_etag)])
+async def get_month_anniversaries(
+    year: int = YearPath,
+    month: int = MonthPath,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get anniversaries for a specific month"""
     if not current_user.partner_id:
         return {}
     
-    # Get all anniversaries for this month
-    anniversaries = db.query(AnniversaryModel).filter(
-        ((AnniversaryModel.user_id == current_user.id) & (AnniversaryModel.partner_id == current_user.partner_id)) |
-        ((AnniversaryModel.user_id == current_user.partner_id) & (AnniversaryModel.partner_id == current_user.id))
-    ).all()
-    
-    # Filter by month and create result dict
+    anniversaries = await get_couple_anniversaries(db, current_user.id, current_user.partner_id)
+    return anniversaries_by_day(anniversaries, month)
+
+async def get_couple_anniversaries(db: AsyncSession, user_id: int, partner_id: int) -> List[AnniversaryModel]:
+    """All anniversaries shared by a couple, whichever partner created them"""
+    result = await db.execute(select(AnniversaryModel).where(
+        ((AnniversaryModel.user_id == user_id) & (AnniversaryModel.partner_id == partner_id)) |
+        ((AnniversaryModel.user_id == partner_id) & (AnniversaryModel.partner_id == user_id))
+    ))
+    return result.scalars().all()
+
+def anniversaries_by_day(anniversaries: List[AnniversaryModel], month: int) -> dict:
+    """Anniversaries falling in a month (recurring yearly), keyed by day"""
     result = {}
     for anniversary in anniversaries:
-        # Check if anniversary is in this month (considering recurring yearly)
         if anniversary.date.month == month:
             day = anniversary.date.day
             result[day] = {
@@ -92,20 +99,31 @@ def get_month_anniversaries(
     return result
 
 @router.delete("/{anniversary_id}")
-def delete_anniversary(
+async def delete_anniversary(
     anniversary_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    anniversary = db.query(AnniversaryModel).filter(
+    result = await db.execute(select(AnniversaryModel).where(
         AnniversaryModel.id == anniversary_id,
         ((AnniversaryModel.user_id == current_user.id) | (AnniversaryModel.partner_id == current_user.id))
-    ).first()
+    ))
+    anniversary = result.scalars().first()
     
     if not anniversary:
         raise HTTPException(status_code=404, detail="Anniversary not found")
     
-    db.delete(anniversary)
-    db.commit()
+    await db.delete(anniversary)
+    sync.record_deletion(db, sync.ANNIVERSARY, anniversary.id, [anniversary.user_id, anniversary.partner_id])
+    await bump_data_version(db, current_user.id)
+    await db.commit()
+    _publish_anniversary(events.ANNIVERSARY_DELETED, anniversary)
     
-    return {"message": "Anniversary deleted"}
\ No newline at end of file
+    return {"message": "Anniversary deleted"}
+
+def _publish_anniversary(event_type: str, anniversary: AnniversaryModel):
+    event_hub.publish(
+        [anniversary.user_id, anniversary.partner_id],
+        event_type,
+        {"id": anniversary.id, "date": anniversary.date, "name": anniversary.name}
+    )
\ No newline at end of file
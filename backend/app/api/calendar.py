@@ -0,0 +1,89 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_db
+from app.api.deps import CurrentUser, MonthPath, YearPath, get_current_user, couple_etag
+from app.api.diary import get_diary_days, build_month_calendar, month_bounds
+from app.api.anniversary import get_couple_anniversaries, anniversaries_by_day
+from app.api.photos import get_couple_id, get_couple_monthly_photos, monthly_photo_response
+
+router = APIRouter()
+
+async def _load_calendar(
+    db: AsyncSession,
+    current_user: CurrentUser,
+    start_date: datetime,
+    end_date: datetime,
+    year: int,
+    month=None
+):
+    """Diary days, anniversaries and monthly photos for a couple
+
+    Three short indexed queries, one after another on the request's
+    session, so a calendar request never holds more than one connection.
+    """
+    partner_id = current_user.partner_id
+    diary_days = await get_diary_days(db, [current_user.id, partner_id], start_date, end_date)
+    anniversaries = []
+    photos = []
+    if partner_id:
+        anniversaries = await get_couple_anniversaries(db, current_user.id, partner_id)
+        photos = await get_couple_monthly_photos(db, get_couple_id(current_user.id, partner_id), year, month)
+    return diary_days, anniversaries, photos
+
+@router.get("/{year}", dependencies=[Depends(couple_etag)])
+async def get_year_calendar(
+    request: Request,
+    year: int = YearPath,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Everything the calendar needs for a whole year in one request
+
+    Diary days are returned as compact per-author bitmasks for each month.
+    """
+    start_date, _ = month_bounds(year, 1)
+    _, end_date = month_bounds(year, 12)
+    diary_days, anniversaries, photos = await _load_calendar(db, current_user, start_date, end_date, year)
+
+    my_dates = diary_days.get(current_user.id, set())
+    partner_dates = diary_days.get(current_user.partner_id, set())
+    photos_by_month = {photo.month: photo for photo in photos}
+
+    months = {}
+    for month in range(1, 13):
+        photo = photos_by_month.get(month)
+        months[month] = {
+            "diaries": build_month_calendar(year, month, my_dates, partner_dates, compact=True),
+            "anniversaries": anniversaries_by_day(anniversaries, month),
+            "photo": monthly_photo_response(photo, request) if photo else None
+        }
+
+    return {"year": year, "months": months}
+
+@router.get("/{year}/{month}", dependencies=[Depends(couple_etag)])
+async def get_month_calendar(
+    request: Request,
+    year: int = YearPath,
+    month: int = MonthPath,
+    compact: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Month bundle: the /diary/month, /anniversary/month and /photos payloads in one response"""
+    start_date, end_date = month_bounds(year, month)
+    diary_days, anniversaries, photos = await _load_calendar(db, current_user, start_date, end_date, year, month)
+
+    return {
+        "year": year,
+        "month": month,
+        "diaries": build_month_calendar(
+            year,
+            month,
+            diary_days.get(current_user.id, set()),
+            diary_days.get(current_user.partner_id, set()),
+            compact
+        ),
+        "anniversaries": anniversaries_by_day(anniversaries, month),
+        "photo": monthly_photo_response(photos[0], request) if photos else None
+    }
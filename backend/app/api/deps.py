@@ -1,37 +1,162 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Optional
+import uuid
+from urllib.parse import urlencode
+from fastapi import Depends, HTTPException, Path, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from app.db.database import get_db
+from app.core.cache import TTLCache
+from app.core.conditional import NotModified, etag_matches, make_etag
+from app.core.config import settings
+from app.core.diary_date import logical_diary_date
+from app.core.invalidation import invalidation_bus
 from app.core.security import decode_token
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+# Out-of-range values would otherwise fail inside date()/monthrange() with a 500
+YearPath = Path(..., ge=1900, le=2100)
+MonthPath = Path(..., ge=1, le=12)
+DayPath = Path(..., ge=1, le=31)
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Read-only snapshot of the authenticated user and their partner.
+
+    Handlers that modify the user must load the ORM row with db.get()
+    and call invalidate_principal() after committing.
+    """
+    id: int
+    email: str
+    name: Optional[str]
+    partner_id: Optional[int]
+    reminder_time: Optional[time]
+    created_at: datetime
+    partner: Optional["CurrentUser"] = None
+
+    @classmethod
+    def from_user(cls, user: User, partner: Optional[User] = None) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            partner_id=user.partner_id,
+            reminder_time=user.reminder_time,
+            created_at=user.created_at,
+            partner=cls.from_user(partner) if partner is not None else None,
+        )
+
+principal_cache = TTLCache(
+    "principal",
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+invalidation_bus.register(principal_cache)
+
+def invalidate_principal(*user_ids: Optional[int]):
+    """Drop cached snapshots in every worker, e.g. for a user and their (former) partner"""
+    invalidation_bus.publish(principal_cache.name, user_ids)
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[CurrentUser]:
+    """Load a user and their partner in a single round trip"""
+    Partner = aliased(User)
+    result = await db.execute(
+        select(User, Partner)
+        .outerjoin(Partner, Partner.id == User.partner_id)
+        .where(User.id == user_id)
     )
-    
+    row = result.first()
+    if row is None:
+        return None
+    return CurrentUser.from_user(row[0], row[1])
+
+async def authenticate(token: Optional[str], db: AsyncSession, scope: Optional[str] = None) -> Optional[CurrentUser]:
+    """Resolve an access token to the cached principal; None if it is not valid
+
+    Login tokens carry no scope. A scoped token (such as the short-lived
+    events stream token) is only accepted where that scope is asked for.
+    """
+    if not token:
+        return None
+
     payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
-    
+    if payload is None or payload.get("scope") != scope:
+        return None
+
     user_id_str = payload.get("sub")
     if user_id_str is None:
-        raise credentials_exception
-    
+        return None
+
     try:
         user_id = int(user_id_str)
     except (ValueError, TypeError):
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
+        return None
+
+    user = principal_cache.get(user_id)
+    if user is None:
+        user = await load_principal(db, user_id)
+        if user is None:
+            return None
+        principal_cache.set(user_id, user)
+
+    return user
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> CurrentUser:
+    user = await authenticate(token, db)
     if user is None:
-        raise credentials_exception
-    
-    return user
\ No newline at end of file
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def bump_data_version(db: AsyncSession, user_id: int):
+    """Invalidate the couple's conditional-GET validators.
+
+    Runs in the caller's transaction, so the new version becomes visible
+    together with the write itself.
+    """
+    await db.execute(
+        update(User).where(User.id == user_id).values(data_version=uuid.uuid4().hex)
+        .execution_options(synchronize_session=False)
+    )
+
+async def couple_etag(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> str:
+    """Route dependency for couple-scoped GETs: answers 304 before the route runs
+
+    The ETag covers both partners' data versions and the logical diary day
+    (views mark today and what can still be written).
+    """
+    user_ids = [current_user.id]
+    if current_user.partner_id:
+        user_ids.append(current_user.partner_id)
+    result = await db.execute(select(User.id, User.data_version).where(User.id.in_(user_ids)))
+    versions = dict(result.all())
+    # End the read so the connection goes back to the pool, e.g. when the
+    # answer is a 304
+    await db.rollback()
+    etag = make_etag(
+        request.url.path,
+        # Query flags such as compact=true change the body, not just the path
+        urlencode(sorted(request.query_params.multi_items())),
+        logical_diary_date().isoformat(),
+        *(f"{user_id}:{versions.get(user_id) or ''}" for user_id in user_ids)
+    )
+    request.state.etag = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise NotModified(etag)
+    return etag
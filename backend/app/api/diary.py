@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from sqlalchemy import select, insert, update, exists, extract, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional, Set, Tuple, Union
+from datetime import date, datetime
+import asyncio
+import base64
 import uuid
-import os
 from app.db.database import get_db
 from app.models.diary import Diary as DiaryModel
 from app.models.diary_photo import DiaryPhoto
-from app.models.user import User
-from app.schemas.diary import DiaryCreate, Diary, DiaryUpdate
-from app.api.deps import get_current_user
-from app.services.push_notification import send_push_notification
+from app.models.photo_variants import smallest_variant_url
+from app.schemas.diary import DiaryCreate, Diary, DiaryUpdate, DiaryPage, DiarySummary, DiarySummaryPage, DiarySearchPage, DiaryMemories
+from app.api.deps import CurrentUser, DayPath, MonthPath, YearPath, get_current_user, couple_etag, bump_data_version
+from app.services.push_queue import push_dispatcher
+from app.services import events
+from app.services.events import event_hub
+from app.services.search import search_diaries
+from app.services.images import store_photo
+from app.services.uploads import check_upload_size, discard_staged, stage_upload, upload_slots
+from app.core.config import settings
+from app.core.diary_date import logical_diary_date, can_write_diary
 
 router = APIRouter()
 
@@ -18,8 +29,8 @@ router = APIRouter()
 @router.post("/", response_model=Diary)
 async def create_diary(
     diary: DiaryCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Create diary without photos (JSON)"""
     return await _create_diary_internal(
@@ -35,8 +46,8 @@ async def create_diary_with_photos(
     title: Optional[str] = Form(None),
     content: Optional[str] = Form(None),
     photos: List[UploadFile] = File([]),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Create diary with photos (multipart/form-data)"""
     print(f"DEBUG: Received form data - title: {title}, content: {content[:50] if content else None}")
@@ -67,165 +78,285 @@ async def _create_diary_internal(
     title: str,
     content: str,
     photos: Optional[List[UploadFile]],
-    db: Session,
-    current_user: User
+    db: AsyncSession,
+    current_user: CurrentUser
 ):
+    # Oversized photos would otherwise fail after the diary is saved
+    for photo in photos or []:
+        if photo:
+            check_upload_size(photo)
+    
     now = datetime.utcnow()
-    today = now.date()
-    
-    # Check if still within writing time (until 6 AM next day)
-    cutoff_time = datetime.combine(today, datetime.min.time()).replace(hour=6)
-    if now.hour < 6:
-        # If it's before 6 AM, we're writing for yesterday
-        today = (now - timedelta(days=1)).date()
-        cutoff_time = now.replace(hour=6, minute=0, second=0, microsecond=0)
-    else:
-        # Next day 6 AM
-        cutoff_time = (cutoff_time + timedelta(days=1))
-    
-    if now > cutoff_time:
-        raise HTTPException(
-            status_code=400,
-            detail="Writing time has expired for this date"
-        )
     
-    # Check if user already wrote diary for this date
-    existing_diary = db.query(DiaryModel).filter(
-        DiaryModel.author_id == current_user.id,
-        DiaryModel.created_at >= today,
-        DiaryModel.created_at < today + timedelta(days=1)
-    ).first()
-    
-    if existing_diary:
-        raise HTTPException(
-            status_code=400,
-            detail="You already wrote a diary for this date"
-        )
+    # Before 6 AM we're still writing for yesterday
+    diary_date = logical_diary_date(now)
     
+    # One diary per author and day is enforced by the unique
+    # (author_id, diary_date) index, so no check-then-insert round trip
     db_diary = DiaryModel(
         title=title,
         content=content,
-        author_id=current_user.id
+        author_id=current_user.id,
+        diary_date=diary_date,
+        created_at=now,
+        updated_at=now
     )
     db.add(db_diary)
-    db.commit()
-    db.refresh(db_diary)
+    try:
+        await bump_data_version(db, current_user.id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="You already wrote a diary for this date"
+        )
     
     # Handle photo uploads if provided
     if photos and len(photos) > 0:
         await _handle_diary_photos(db, db_diary.id, photos, current_user)
     
-    # Send push notification to partner if they exist and have push subscription
-    if current_user.partner_id:
-        partner = db.query(User).filter(User.id == current_user.partner_id).first()
-        if partner and partner.push_subscription:
-            author_name = current_user.name or current_user.email
-            send_push_notification(
-                partner.push_subscription,
-                "새로운 일기가 도착했어요!",
-                f"{author_name}님이 오늘의 일기를 작성했습니다."
-            )
+    event_hub.publish(
+        [current_user.id, current_user.partner_id],
+        events.DIARY_CREATED,
+        {"id": db_diary.id, "author_id": current_user.id, "diary_date": db_diary.diary_date}
+    )
+    
+    # Notify every device the partner has registered for push
+    partner = current_user.partner
+    if partner:
+        author_name = current_user.name or current_user.email
+        push_dispatcher.enqueue(
+            partner.id,
+            "새로운 일기가 도착했어요!",
+            f"{author_name}님이 오늘의 일기를 작성했습니다."
+        )
     
-    return db_diary
+    return await _get_diary_with_photos(db, db_diary.id)
 
-@router.get("/my", response_model=List[Diary])
-def get_my_diaries(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def _get_diary_with_photos(db: AsyncSession, diary_id: int) -> DiaryModel:
+    result = await db.execute(select(DiaryModel).options(
+        selectinload(DiaryModel.photos)
+    ).where(DiaryModel.id == diary_id).execution_options(populate_existing=True))
+    return result.scalar_one()
+
+@router.get("/my", response_model=Union[DiarySummaryPage, DiaryPage])
+async def get_my_diaries(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    view: str = Query("summary", pattern="^(summary|full)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    diaries = db.query(DiaryModel).options(
-        joinedload(DiaryModel.photos)
-    ).filter(
-        DiaryModel.author_id == current_user.id
-    ).order_by(DiaryModel.created_at.desc()).all()
-    return diaries
+    """Page through own diaries, newest first
+
+    Pass the returned next_cursor to get the following page. The default
+    summary view skips content; open a diary with GET /diary/{id}.
+    """
+    conditions = [DiaryModel.author_id == current_user.id]
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        conditions.append(tuple_(DiaryModel.created_at, DiaryModel.id) < tuple_(cursor_created_at, cursor_id))
+    order_by = (DiaryModel.created_at.desc(), DiaryModel.id.desc())
+    
+    if view == "full":
+        result = await db.execute(select(DiaryModel).options(
+            selectinload(DiaryModel.photos)
+        ).where(*conditions).order_by(*order_by).limit(limit + 1))
+        diaries = result.scalars().all()
+        return DiaryPage(
+            items=diaries[:limit],
+            next_cursor=_encode_cursor(diaries[limit - 1]) if len(diaries) > limit else None
+        )
+    
+    # Summary columns come from the (author_id, created_at, id) covering index,
+    # photo data from the diary_photos.diary_id index
+    photo_count = select(func.count(DiaryPhoto.id)).where(
+        DiaryPhoto.diary_id == DiaryModel.id
+    ).scalar_subquery()
+    first_photo_url = select(DiaryPhoto.photo_url).where(
+        DiaryPhoto.diary_id == DiaryModel.id
+    ).order_by(DiaryPhoto.id).limit(1).scalar_subquery()
+    first_photo_variants = select(DiaryPhoto.variants).where(
+        DiaryPhoto.diary_id == DiaryModel.id
+    ).order_by(DiaryPhoto.id).limit(1).scalar_subquery()
+    result = await db.execute(select(
+        DiaryModel.id,
+        DiaryModel.title,
+        DiaryModel.diary_date,
+        DiaryModel.created_at,
+        photo_count.label("photo_count"),
+        first_photo_url.label("first_photo_url"),
+        first_photo_variants.label("first_photo_variants")
+    ).where(*conditions).order_by(*order_by).limit(limit + 1))
+    rows = result.all()
+    return DiarySummaryPage(
+        items=[
+            DiarySummary(
+                **row._mapping,
+                first_photo_thumbnail_url=smallest_variant_url(row.first_photo_variants)
+            )
+            for row in rows[:limit]
+        ],
+        next_cursor=_encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    )
+
+def _encode_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, diary_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(diary_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/partner", response_model=List[Diary])
-def get_partner_diaries(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_partner_diaries(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     if not current_user.partner_id:
         return []
     
-    # Get partner's diaries that were written today
-    today = datetime.utcnow().date()
-    partner_diaries = db.query(DiaryModel).filter(
+    today = logical_diary_date()
+    # Only show partner's diary if user has written their own; checked in the same query
+    wrote_today = exists().where(
+        DiaryModel.author_id == current_user.id,
+        DiaryModel.diary_date == today
+    )
+    result = await db.execute(select(DiaryModel).options(
+        selectinload(DiaryModel.photos)
+    ).where(
         DiaryModel.author_id == current_user.partner_id,
-        DiaryModel.created_at >= today
-    ).all()
+        DiaryModel.diary_date == today,
+        wrote_today
+    ))
+    partner_diaries = result.scalars().all()
+    
+    # Mark partner's diaries as read; no write transaction when all are read already
+    if any(not diary.is_read_by_partner for diary in partner_diaries):
+        result = await db.execute(
+            update(DiaryModel)
+            .where(
+                DiaryModel.author_id == current_user.partner_id,
+                DiaryModel.diary_date == today,
+                DiaryModel.is_read_by_partner.isnot(True)
+            )
+            .values(is_read_by_partner=True)
+            .returning(DiaryModel.id)
+        )
+        newly_read = result.scalars().all()
+        if newly_read:
+            # The author's day view shows the read flag
+            await bump_data_version(db, current_user.id)
+        await db.commit()
+        if newly_read:
+            # Read receipts for the author
+            event_hub.publish([current_user.partner_id], events.DIARY_READ, {"ids": newly_read})
+    
+    return partner_diaries
+
+
+@router.get("/month/{year}/{month}", dependencies=[Depends(couple_etag)])
+async def get_month_diaries(
+    year: int = YearPath,
+    month: int = MonthPath,
+    compact: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get diary status for each day in a specific month
+
+    With ?compact=true the days are returned as per-author bitmasks
+    (bit 0 = day 1) instead of one object per day.
+    """
+    start_date, end_date = month_bounds(year, month)
+    author_days = await get_diary_days(db, [current_user.id, current_user.partner_id], start_date, end_date)
+    return build_month_calendar(
+        year,
+        month,
+        author_days.get(current_user.id, set()),
+        author_days.get(current_user.partner_id, set()),
+        compact
+    )
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """[start, end) datetimes of a calendar month"""
+    start_date = datetime(year, month, 1)
+    end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start_date, end_date
+
+async def get_diary_days(
+    db: AsyncSession,
+    author_ids: List[Optional[int]],
+    start_date: datetime,
+    end_date: datetime
+) -> Dict[int, Set[date]]:
+    """Dates with a diary in [start_date, end_date), per author, in one query"""
+    author_ids = [author_id for author_id in author_ids if author_id]
+    
+    # Only (author_id, diary_date) pairs come back - no content, no ORM
+    # objects; answered from the unique (author_id, diary_date) index
+    result = await db.execute(
+        select(DiaryModel.author_id, DiaryModel.diary_date)
+        .where(
+            DiaryModel.author_id.in_(author_ids),
+            DiaryModel.diary_date >= start_date.date(),
+            DiaryModel.diary_date < end_date.date()
+        )
+    )
     
-    # Check if current user has written diary today
-    my_diary_today = db.query(DiaryModel).filter(
-        DiaryModel.author_id == current_user.id,
-        DiaryModel.created_at >= today
-    ).first()
-    
-    # Only show partner's diary if user has written their own
-    if my_diary_today:
-        # Mark partner's diaries as read
-        for diary in partner_diaries:
-            diary.is_read_by_partner = True
-        db.commit()
-        return partner_diaries
-    
-    return []
+    author_days: Dict[int, Set[date]] = {}
+    for author_id, diary_date in result:
+        author_days.setdefault(author_id, set()).add(diary_date)
+    return author_days
 
-@router.get("/month/{year}/{month}")
-def get_month_diaries(
+def build_month_calendar(
     year: int,
     month: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get diary status for each day in a specific month"""
+    my_dates: Set[date],
+    partner_dates: Set[date],
+    compact: bool = False
+) -> dict:
+    """Per-day diary status for a month, or per-author day bitmasks if compact"""
     from calendar import monthrange
-    from collections import defaultdict
     
     # Get number of days in the month
     _, days_in_month = monthrange(year, month)
     
-    # Initialize result
-    result = {}
-    
-    # Get all diaries for this month
-    start_date = datetime(year, month, 1)
-    end_date = datetime(year, month, days_in_month, 23, 59, 59)
-    
-    my_diaries = db.query(DiaryModel).filter(
-        DiaryModel.author_id == current_user.id,
-        DiaryModel.created_at >= start_date,
-        DiaryModel.created_at <= end_date
-    ).all()
+    my_diary_days = {d.day for d in my_dates if d.year == year and d.month == month}
+    partner_diary_days = {d.day for d in partner_dates if d.year == year and d.month == month}
     
-    partner_diaries = []
-    if current_user.partner_id:
-        partner_diaries = db.query(DiaryModel).filter(
-            DiaryModel.author_id == current_user.partner_id,
-            DiaryModel.created_at >= start_date,
-            DiaryModel.created_at <= end_date
-        ).all()
+    today = logical_diary_date()
     
-    # Create lookup dictionaries
-    my_diary_days = {d.created_at.day: d for d in my_diaries}
-    partner_diary_days = {d.created_at.day: d for d in partner_diaries}
+    if compact:
+        return {
+            "year": year,
+            "month": month,
+            "days_in_month": days_in_month,
+            "today": today.isoformat(),
+            "my_days": _day_bitmask(my_diary_days),
+            "partner_days": _day_bitmask(partner_diary_days)
+        }
     
     # Build result for each day
-    today = datetime.utcnow().date()
-    
+    result = {}
     for day in range(1, days_in_month + 1):
-        date = datetime(year, month, day).date()
+        day_date = date(year, month, day)
         has_my_diary = day in my_diary_days
         has_partner_diary = day in partner_diary_days
         
         status = "future"
-        if date < today:
+        if day_date < today:
             status = "past"
-        elif date == today:
+        elif day_date == today:
             status = "today"
         
         result[day] = {
-            "date": date.isoformat(),
+            "date": day_date.isoformat(),
             "status": status,
             "has_my_diary": has_my_diary,
             "has_partner_diary": has_partner_diary,
@@ -234,41 +365,49 @@ def get_month_diaries(
     
     return result
 
-@router.get("/date/{year}/{month}/{day}")
-def get_day_diaries(
-    year: int,
-    month: int,
-    day: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+def _day_bitmask(days: Set[int]) -> int:
+    mask = 0
+    for day in days:
+        mask |= 1 << (day - 1)
+    return mask
+
+@router.get("/date/{year}/{month}/{day}", dependencies=[Depends(couple_etag)])
+async def get_day_diaries(
+    year: int = YearPath,
+    month: int = MonthPath,
+    day: int = DayPath,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get diaries for a specific date"""
-    date = datetime(year, month, day).date()
-    next_date = date + timedelta(days=1)
+    try:
+        date = datetime(year, month, day).date()
+    except ValueError:
+        # e.g. 2/30, which the per-part bounds let through
+        raise HTTPException(status_code=422, detail="Invalid date")
     
     # Get my diary with photos
-    my_diary = db.query(DiaryModel).options(
-        joinedload(DiaryModel.photos)
-    ).filter(
+    result = await db.execute(select(DiaryModel).options(
+        selectinload(DiaryModel.photos)
+    ).where(
         DiaryModel.author_id == current_user.id,
-        DiaryModel.created_at >= date,
-        DiaryModel.created_at < next_date
-    ).first()
+        DiaryModel.diary_date == date
+    ))
+    my_diary = result.scalars().first()
     
     # Get partner's diary
     partner_diary = None
     partner_name = None
     if current_user.partner_id:
-        partner = db.query(User).filter(User.id == current_user.partner_id).first()
-        partner_name = partner.name if partner else None
+        partner_name = current_user.partner.name if current_user.partner else None
         
-        partner_diary = db.query(DiaryModel).options(
-            joinedload(DiaryModel.photos)
-        ).filter(
+        result = await db.execute(select(DiaryModel).options(
+            selectinload(DiaryModel.photos)
+        ).where(
             DiaryModel.author_id == current_user.partner_id,
-            DiaryModel.created_at >= date,
-            DiaryModel.created_at < next_date
-        ).first()
+            DiaryModel.diary_date == date
+        ))
+        partner_diary = result.scalars().first()
     
     return {
         "date": date.isoformat(),
@@ -276,35 +415,115 @@ def get_day_diaries(
         "partner_diary": partner_diary,
         "my_name": current_user.name or "나",
         "partner_name": partner_name or "상대방",
-        "can_write": _can_write_diary(date)
+        "can_write": can_write_diary(date)
     }
 
-def _can_write_diary(date: datetime.date) -> bool:
-    """Check if user can still write diary for given date"""
-    now = datetime.utcnow()
-    cutoff = datetime.combine(date + timedelta(days=1), datetime.min.time()).replace(hour=6)
-    return now <= cutoff
+@router.get("/memories/{month}/{day}", response_model=DiaryMemories)
+async def get_memories(
+    month: int,
+    day: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """My and my partner's diaries written on this calendar day in previous years"""
+    try:
+        date(2000, month, day)  # leap year, so 2/29 is valid
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date")
+    
+    author_ids = [current_user.id]
+    if current_user.partner_id:
+        author_ids.append(current_user.partner_id)
+    
+    diaries = await get_memory_diaries(db, author_ids, month, day, date(logical_diary_date().year, 1, 1))
+    
+    years: Dict[int, dict] = {}
+    for diary in diaries:
+        entry = years.setdefault(diary.diary_date.year, {"year": diary.diary_date.year})
+        entry["my_diary" if diary.author_id == current_user.id else "partner_diary"] = diary
+    
+    return {"month": month, "day": day, "years": list(years.values())}
+
+async def get_memory_diaries(db: AsyncSession, author_ids: List[int], month: int, day: int, before: date) -> List[DiaryModel]:
+    """Diaries of the given authors on month/day before `before`, newest year first"""
+    # Same expressions as ix_diaries_month_day_author_id, so only matching rows are read
+    result = await db.execute(select(DiaryModel).options(
+        selectinload(DiaryModel.photos)
+    ).where(
+        extract("month", DiaryModel.diary_date) == month,
+        extract("day", DiaryModel.diary_date) == day,
+        DiaryModel.author_id.in_(author_ids),
+        DiaryModel.diary_date < before
+    ).order_by(DiaryModel.diary_date.desc()))
+    return result.scalars().all()
+
+@router.get("/search", response_model=DiarySearchPage)
+async def search_couple_diaries(
+    q: str = Query(..., min_length=1, max_length=200),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Full-text search over my and my partner's diaries, best match first"""
+    author_ids = [current_user.id]
+    if current_user.partner_id:
+        author_ids.append(current_user.partner_id)
+    
+    # One extra row tells whether there is a next page
+    items = await search_diaries(db, author_ids, q, from_date, to_date, limit + 1, offset)
+    next_offset = offset + limit if len(items) > limit else None
+    
+    return {"items": items[:limit], "next_offset": next_offset}
+
+@router.get("/{diary_id}", response_model=Diary)
+async def get_diary(
+    diary_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get a single diary with its full content (own or partner's)"""
+    author_ids = [current_user.id]
+    if current_user.partner_id:
+        author_ids.append(current_user.partner_id)
+    
+    result = await db.execute(select(DiaryModel).options(
+        selectinload(DiaryModel.photos)
+    ).where(
+        DiaryModel.id == diary_id,
+        DiaryModel.author_id.in_(author_ids)
+    ))
+    diary = result.scalars().first()
+    
+    if not diary:
+        raise HTTPException(status_code=404, detail="Diary not found")
+    
+    return diary
 
 @router.put("/{diary_id}", response_model=Diary)
-def update_diary(
+async def update_diary(
     diary_id: int,
     diary_update: DiaryUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Update own diary (only allowed until 6 AM next day)"""
     # Get the diary
-    diary = db.query(DiaryModel).filter(
+    result = await db.execute(select(DiaryModel).options(
+        selectinload(DiaryModel.photos)
+    ).where(
         DiaryModel.id == diary_id,
         DiaryModel.author_id == current_user.id
-    ).first()
+    ))
+    diary = result.scalars().first()
     
     if not diary:
         raise HTTPException(status_code=404, detail="Diary not found")
     
     # Check if can still edit (until 6 AM next day)
-    diary_date = diary.created_at.date()
-    if not _can_write_diary(diary_date):
+    if not can_write_diary(diary.diary_date):
         raise HTTPException(
             status_code=403,
             detail="Cannot edit diary after 6 AM next day"
@@ -315,76 +534,71 @@ def update_diary(
     diary.content = diary_update.content
     diary.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(diary)
+    await bump_data_version(db, current_user.id)
+    await db.commit()
+    event_hub.publish(
+        [current_user.id, current_user.partner_id],
+        events.DIARY_UPDATED,
+        {"id": diary.id, "author_id": current_user.id, "diary_date": diary.diary_date}
+    )
     
     return diary
 
 async def _handle_diary_photos(
-    db: Session,
+    db: AsyncSession,
     diary_id: int,
     photos: List[UploadFile],
-    current_user: User
+    current_user: CurrentUser
 ):
-    """Handle photo uploads for diary"""
-    # Import here to avoid circular dependency
-    from app.api.photos import get_supabase_client
-    
+    """Handle photo uploads for diary
+
+    Photos are uploaded concurrently, bounded per request and across the
+    worker, and their rows are written in one INSERT at the end.
+    """
     # Get couple ID for folder organization
     couple_id = f"{min(current_user.id, current_user.partner_id or current_user.id)}_{max(current_user.id, current_user.partner_id or current_user.id)}"
     date_str = datetime.utcnow().strftime("%Y-%m-%d")
-    
-    for photo in photos:
-        if not photo or not photo.filename or photo.filename == "":
-            continue
-            
-        # Generate unique filename
-        file_extension = photo.filename.split('.')[-1] if '.' in photo.filename else 'jpg'
-        unique_filename = f"{diary_id}_{uuid.uuid4()}.{file_extension}"
-        
-        # Try Supabase first
-        try:
-            supabase = get_supabase_client()
-            if supabase:
-                file_path = f"diaries/{couple_id}/{date_str}/{unique_filename}"
-                file_content = await photo.read()
-                
-                response = supabase.storage.from_("photos").upload(
-                    file_path,
-                    file_content,
-                    file_options={"content-type": photo.content_type or "image/jpeg"}
-                )
-                
-                public_url = supabase.storage.from_("photos").get_public_url(file_path)
-                photo_url = public_url
-            else:
-                raise Exception("Supabase not available")
-                
-        except Exception as e:
-            # Fallback to local storage
-            print(f"Supabase upload failed, using local storage: {e}")
-            
-            # Create local directory
-            local_dir = f"uploads/diaries/{couple_id}/{date_str}"
-            os.makedirs(local_dir, exist_ok=True)
-            
-            # Save file locally
-            file_path = f"{local_dir}/{unique_filename}"
-            file_content = await photo.read() if photo.size > 0 else await photo.read()
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-            
-            # Generate local URL
-            base_url = os.getenv("BASE_URL", "http://localhost:8000")
-            photo_url = f"{base_url}/{file_path}"
-        
-        # Save photo record to database
-        db_photo = DiaryPhoto(
-            diary_id=diary_id,
-            photo_url=photo_url,
-            original_filename=photo.filename
-        )
-        db.add(db_photo)
-    
-    db.commit()
+    photos = [photo for photo in photos if photo and photo.filename]
+    if not photos:
+        return
+    
+    request_slots = asyncio.Semaphore(settings.PHOTO_UPLOADS_PER_REQUEST)
+    results = await asyncio.gather(
+        *(
+            _upload_diary_photo(photo, diary_id, couple_id, date_str, request_slots)
+            for photo in photos
+        ),
+        return_exceptions=True
+    )
+    # Every upload has finished by now, so none is left running on failure
+    for outcome in results:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    
+    await db.execute(insert(DiaryPhoto), [
+        {"diary_id": diary_id, "photo_url": photo_url, "variants": variants, "original_filename": photo.filename}
+        for photo, (photo_url, variants) in zip(photos, results)
+    ])
+    await bump_data_version(db, current_user.id)
+    await db.commit()
 
+async def _upload_diary_photo(
+    photo: UploadFile,
+    diary_id: int,
+    couple_id: str,
+    date_str: str,
+    request_slots: asyncio.Semaphore
+) -> Tuple[str, Optional[List[dict]]]:
+    """Store one diary photo and its variants; returns (url, variants)"""
+    # Generate unique filename
+    file_extension = photo.filename.split('.')[-1] if '.' in photo.filename else 'jpg'
+    unique_filename = f"{diary_id}_{uuid.uuid4()}.{file_extension}"
+    key = f"diaries/{couple_id}/{date_str}/{unique_filename}"
+    
+    async with request_slots, upload_slots():
+        # Copy to a temp file in chunks instead of reading it into memory
+        staged = await stage_upload(photo)
+        try:
+            return await store_photo(key, staged, photo.content_type)
+        finally:
+            await discard_staged(staged)
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.api.deps import CurrentUser, authenticate, get_current_user, oauth2_scheme_optional
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.database import AsyncSessionLocal
+from app.services.events import event_hub
+
+router = APIRouter()
+
+STREAM_TOKEN_SCOPE = "events"
+
+@router.post("/token")
+async def create_stream_token(current_user: CurrentUser = Depends(get_current_user)):
+    """Short-lived token for opening /api/events?token=...
+
+    EventSource cannot send headers, and a query string ends up in access
+    logs and browser history, so it gets this instead of the login token.
+    The token opens a stream and nothing else.
+    """
+    expires = timedelta(minutes=settings.EVENTS_TOKEN_EXPIRE_MINUTES)
+    token = create_access_token({"sub": str(current_user.id), "scope": STREAM_TOKEN_SCOPE}, expires)
+    return {"token": token, "expires_in": int(expires.total_seconds())}
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    token: Optional[str] = None,
+    header_token: Optional[str] = Depends(oauth2_scheme_optional)
+):
+    """Server-sent events for the current user and their partner's activity
+
+    Authenticates with the usual Authorization header or, for EventSource,
+    a ?token= from POST /api/events/token.
+    """
+    # Authenticate on a short-lived session; the stream itself holds no connection
+    async with AsyncSessionLocal() as db:
+        if header_token:
+            current_user = await authenticate(header_token, db)
+        else:
+            current_user = await authenticate(token, db, scope=STREAM_TOKEN_SCOPE)
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+
+    subscription = event_hub.subscribe(current_user.id)
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        settings.EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event.encode()
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
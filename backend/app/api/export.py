@@ -0,0 +1,247 @@
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator
+from urllib.parse import urlparse
+import httpx
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from app.db.database import AsyncSessionLocal
+from app.models.diary import Diary as DiaryModel
+from app.models.diary_photo import DiaryPhoto
+from app.models.monthly_photo import MonthlyPhoto
+from app.api.deps import CurrentUser, get_current_user
+from app.api.anniversary import get_couple_anniversaries
+from app.api.photos import get_couple_id
+from app.core.metrics import metrics
+from app.services.storage import StorageUnavailable, locate
+
+router = APIRouter()
+
+CHUNK_SIZE = 64 * 1024
+ROWS_PER_BATCH = 500
+
+class _ZipSink:
+    """Write-only, unseekable file for ZipFile; the response drains it as it fills.
+
+    Without seek() ZipFile writes data descriptors after each entry, so
+    nothing has to be buffered beyond the bytes not yet sent.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+def _json_line(row: dict) -> bytes:
+    return (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode()
+
+async def _read_photo(photo_url: str) -> AsyncIterator[bytes]:
+    """Photo bytes in chunks from whichever storage backend holds the photo"""
+    located = locate(photo_url)
+    if located is None:
+        raise FileNotFoundError(f"Not in photo storage: {photo_url}")
+    backend, key = located
+    async for chunk in backend.read_stream(key):
+        yield chunk
+
+def _archive_name(folder: str, photo_id: int, photo_url: str) -> str:
+    return f"{folder}/{photo_id}_{os.path.basename(urlparse(photo_url).path)}"
+
+async def _diary_rows(author_ids: list) -> AsyncIterator[dict]:
+    """Diaries of the given authors in keyset batches
+
+    Each batch is read in its own short session, so no connection sits
+    idle in a transaction while a slow client downloads the archive.
+    """
+    last = None
+    while True:
+        query = (
+            select(
+                DiaryModel.id,
+                DiaryModel.author_id,
+                DiaryModel.diary_date,
+                DiaryModel.title,
+                DiaryModel.content,
+                DiaryModel.created_at,
+                DiaryModel.updated_at,
+                DiaryModel.is_read_by_partner
+            )
+            .where(DiaryModel.author_id.in_(author_ids))
+            .order_by(DiaryModel.diary_date, DiaryModel.id)
+            .limit(ROWS_PER_BATCH)
+        )
+        if last is not None:
+            query = query.where(tuple_(DiaryModel.diary_date, DiaryModel.id) > tuple_(*last))
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+        for row in rows:
+            yield dict(row._mapping)
+        if len(rows) < ROWS_PER_BATCH:
+            return
+        last = (rows[-1].diary_date, rows[-1].id)
+
+async def _diary_photos(author_ids: list) -> AsyncIterator[DiaryPhoto]:
+    """Diary photos of the given authors in keyset batches, each read in
+    its own short session like _diary_rows
+    """
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(DiaryPhoto)
+                .join(DiaryModel, DiaryModel.id == DiaryPhoto.diary_id)
+                .where(DiaryModel.author_id.in_(author_ids), DiaryPhoto.id > last_id)
+                .order_by(DiaryPhoto.id)
+                .limit(ROWS_PER_BATCH)
+            )
+            photos = result.scalars().all()
+        for photo in photos:
+            yield photo
+        if len(photos) < ROWS_PER_BATCH:
+            return
+        last_id = photos[-1].id
+
+async def _write_photo(
+    archive: zipfile.ZipFile,
+    sink: _ZipSink,
+    name: str,
+    photo_url: str,
+    missing: list
+) -> AsyncIterator[bytes]:
+    """Copy one photo into the archive, yielding output as it fills up.
+
+    Photos are compressed already, so they are stored as is. A photo that
+    cannot be read is listed in the manifest instead; the entry is only
+    opened once its first chunk has arrived.
+    """
+    chunks = _read_photo(photo_url)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except (OSError, httpx.HTTPError, StorageUnavailable) as e:
+        missing.append({"photo_url": photo_url, "error": str(e) or type(e).__name__})
+        return
+
+    info = zipfile.ZipInfo(name, date_time=datetime.utcnow().timetuple()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    with archive.open(info, "w", force_zip64=True) as entry:
+        entry.write(first)
+        async for chunk in chunks:
+            entry.write(chunk)
+            if sink.size >= CHUNK_SIZE:
+                yield sink.drain()
+
+async def _export_archive(current_user: CurrentUser) -> AsyncIterator[bytes]:
+    author_ids = [current_user.id]
+    if current_user.partner_id:
+        author_ids.append(current_user.partner_id)
+    couple_id = get_couple_id(current_user.id, current_user.partner_id) if current_user.partner_id else None
+    counts = {"diaries": 0, "diary_photos": 0}
+    missing = []
+
+    # Couple-wide data is small: read it up front on a short session
+    # (the request's dependencies are closed before the body streams)
+    monthly_photos = []
+    anniversaries = []
+    if couple_id:
+        async with AsyncSessionLocal() as db:
+            anniversaries = await get_couple_anniversaries(db, current_user.id, current_user.partner_id)
+            result = await db.execute(
+                select(MonthlyPhoto)
+                .where(MonthlyPhoto.couple_id == couple_id)
+                .order_by(MonthlyPhoto.year, MonthlyPhoto.month)
+            )
+            monthly_photos = result.scalars().all()
+
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("diaries.ndjson", "w", force_zip64=True) as entry:
+            async for row in _diary_rows(author_ids):
+                entry.write(_json_line(row))
+                counts["diaries"] += 1
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.drain()
+
+        with archive.open("diary_photos.ndjson", "w", force_zip64=True) as entry:
+            async for photo in _diary_photos(author_ids):
+                entry.write(_json_line({
+                    "id": photo.id,
+                    "diary_id": photo.diary_id,
+                    "original_filename": photo.original_filename,
+                    "photo_url": photo.photo_url,
+                    "file": _archive_name("photos/diaries", photo.id, photo.photo_url),
+                    "created_at": photo.created_at,
+                }))
+                counts["diary_photos"] += 1
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.drain()
+
+        archive.writestr("anniversaries.json", json.dumps([
+            {"id": a.id, "date": a.date, "name": a.name, "user_id": a.user_id, "partner_id": a.partner_id}
+            for a in anniversaries
+        ], ensure_ascii=False, default=str))
+
+        archive.writestr("monthly_photos.json", json.dumps([
+            {
+                "id": p.id,
+                "year": p.year,
+                "month": p.month,
+                "photo_url": p.photo_url,
+                "file": _archive_name("photos/monthly", p.id, p.photo_url),
+                "created_by": p.created_by,
+                "created_at": p.created_at,
+            }
+            for p in monthly_photos
+        ], ensure_ascii=False, default=str))
+        counts["monthly_photos"] = len(monthly_photos)
+
+        # Photo files last, one chunk at a time
+        async for photo in _diary_photos(author_ids):
+            name = _archive_name("photos/diaries", photo.id, photo.photo_url)
+            async for data in _write_photo(archive, sink, name, photo.photo_url, missing):
+                yield data
+        for photo in monthly_photos:
+            name = _archive_name("photos/monthly", photo.id, photo.photo_url)
+            async for data in _write_photo(archive, sink, name, photo.photo_url, missing):
+                yield data
+
+        archive.writestr("manifest.json", json.dumps({
+            "exported_at": datetime.utcnow().isoformat(),
+            "user_id": current_user.id,
+            "partner_id": current_user.partner_id,
+            "counts": counts,
+            "missing_files": missing,
+        }, ensure_ascii=False))
+    yield sink.drain()
+    metrics.inc("exports_total")
+
+@router.get("")
+async def export_archive(current_user: CurrentUser = Depends(get_current_user)):
+    """Download the couple's whole archive as a ZIP, streamed while it is built
+
+    Contains diaries.ndjson, diary_photos.ndjson, anniversaries.json,
+    monthly_photos.json, the photo files and a manifest.
+    """
+    filename = f"lovary-export-{datetime.utcnow():%Y%m%d}.zip"
+    return StreamingResponse(
+        _export_archive(current_user),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,196 @@
+import json
+import zipfile
+from datetime import datetime, time, timezone
+from typing import IO, List
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_db
+from app.models.anniversary import Anniversary as AnniversaryModel
+from app.models.diary import Diary as DiaryModel
+from app.schemas.anniversary import AnniversaryCreate
+from app.schemas.diary import DiaryImport, ImportResult
+from app.api.deps import CurrentUser, get_current_user, bump_data_version
+from app.api.anniversary import get_couple_anniversaries
+from app.core.diary_date import logical_diary_date
+from app.core.executor import run_blocking
+from app.core.metrics import metrics
+from app.services import events
+from app.services.events import event_hub
+
+router = APIRouter()
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 50
+
+def _read_lines(stream: IO[bytes], count: int) -> List[bytes]:
+    """Up to `count` lines from a file (blocking)"""
+    lines = []
+    for line in stream:
+        lines.append(line)
+        if len(lines) >= count:
+            break
+    return lines
+
+def _open_zip(upload: IO[bytes]):
+    """Diaries stream, anniversaries and manifest of an export ZIP (blocking)"""
+    archive = zipfile.ZipFile(upload)
+    names = set(archive.namelist())
+    if "diaries.ndjson" not in names:
+        raise HTTPException(status_code=400, detail="Archive has no diaries.ndjson")
+    anniversaries = json.loads(archive.read("anniversaries.json")) if "anniversaries.json" in names else []
+    manifest = json.loads(archive.read("manifest.json")) if "manifest.json" in names else {}
+    return archive.open("diaries.ndjson"), anniversaries, manifest
+
+def _insert_ignoring_duplicates(db: AsyncSession):
+    """INSERT ... ON CONFLICT DO NOTHING for the current dialect"""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(DiaryModel)
+    return sqlite.insert(DiaryModel)
+
+async def _insert_diaries(db: AsyncSession, current_user: CurrentUser, rows: List[dict]) -> int:
+    """One multi-row INSERT and one commit per batch; existing days are skipped"""
+    stmt = (
+        _insert_ignoring_duplicates(db)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["author_id", "diary_date"])
+        .returning(DiaryModel.id)
+    )
+    result = await db.execute(stmt)
+    inserted = len(result.scalars().all())
+    if inserted:
+        await bump_data_version(db, current_user.id)
+    await db.commit()
+    return inserted
+
+def _diary_row(entry: DiaryImport, author_id: int) -> dict:
+    created_at = entry.created_at or datetime.combine(entry.diary_date, time(12))
+    if created_at.tzinfo is not None:
+        # Stored naive in UTC like datetime.utcnow() everywhere else
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "author_id": author_id,
+        "title": entry.title,
+        "content": entry.content,
+        "diary_date": entry.diary_date,
+        "created_at": created_at,
+        # Insert time, not created_at: /sync pages on updated_at, so a past
+        # value would fall behind cursors devices already hold
+        "updated_at": datetime.utcnow(),
+        # Old entries should not show up as unread for the partner
+        "is_read_by_partner": True,
+    }
+
+async def _import_anniversaries(db: AsyncSession, current_user: CurrentUser, entries: list, result: ImportResult):
+    if not entries:
+        return
+    if not current_user.partner_id:
+        result.errors.append("anniversaries: skipped, no partner connected")
+        return
+    existing = {a.date for a in await get_couple_anniversaries(db, current_user.id, current_user.partner_id)}
+    rows = []
+    for position, raw in enumerate(entries, start=1):
+        try:
+            entry = AnniversaryCreate.model_validate(raw)
+        except ValidationError as e:
+            _add_error(result, f"anniversaries[{position}]: {e.errors()[0]['msg']}")
+            continue
+        if entry.date in existing:
+            continue
+        existing.add(entry.date)
+        rows.append({
+            "user_id": current_user.id,
+            "partner_id": current_user.partner_id,
+            "date": entry.date,
+            "name": entry.name,
+        })
+    if rows:
+        await db.execute(AnniversaryModel.__table__.insert().values(rows))
+        await bump_data_version(db, current_user.id)
+        await db.commit()
+    result.anniversaries_inserted = len(rows)
+
+def _add_error(result: ImportResult, message: str):
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(message)
+
+@router.post("", response_model=ImportResult)
+async def import_archive(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Import diaries (and anniversaries) from NDJSON or an export ZIP
+
+    NDJSON lines need title, content and diary_date. Lines are validated
+    as they are read and inserted in batches, each in its own transaction;
+    days that already have a diary are skipped. Only days that are over
+    can be imported: today's diary is written the normal way. An export
+    ZIP must come from my own couple and only my own entries are taken.
+    Progress is published as import.progress events on /api/events.
+    """
+    anniversaries = []
+    source_user_id = None
+    if zipfile.is_zipfile(file.file):
+        file.file.seek(0)
+        lines, anniversaries, manifest = await run_blocking(_open_zip, file.file)
+        if current_user.id not in (manifest.get("user_id"), manifest.get("partner_id")):
+            raise HTTPException(status_code=403, detail="Archive belongs to another account")
+        source_user_id = current_user.id
+    else:
+        file.file.seek(0)
+        lines = file.file
+
+    result = ImportResult()
+    today = logical_diary_date()
+    line_number = 0
+    while True:
+        raw_lines = await run_blocking(_read_lines, lines, BATCH_SIZE)
+        if not raw_lines:
+            break
+
+        rows = []
+        for raw in raw_lines:
+            line_number += 1
+            if not raw.strip():
+                continue
+            try:
+                entry = DiaryImport.model_validate_json(raw)
+            except ValidationError as e:
+                result.processed += 1
+                result.rejected += 1
+                _add_error(result, f"line {line_number}: {e.errors()[0]['msg']}")
+                continue
+            # An export holds both partners' diaries; only mine are imported
+            if source_user_id is not None and entry.author_id != source_user_id:
+                continue
+            result.processed += 1
+            if entry.diary_date >= today:
+                result.rejected += 1
+                _add_error(result, f"line {line_number}: {entry.diary_date} has not ended yet")
+                continue
+            rows.append(_diary_row(entry, current_user.id))
+
+        if rows:
+            inserted = await _insert_diaries(db, current_user, rows)
+            result.inserted += inserted
+            result.skipped += len(rows) - inserted
+        event_hub.publish([current_user.id], events.IMPORT_PROGRESS, {
+            "processed": result.processed,
+            "inserted": result.inserted,
+            "skipped": result.skipped,
+            "rejected": result.rejected,
+        })
+
+    await _import_anniversaries(db, current_user, anniversaries, result)
+
+    if result.inserted or result.anniversaries_inserted:
+        event_hub.publish([current_user.id, current_user.partner_id], events.DIARIES_IMPORTED, {
+            "author_id": current_user.id,
+            "inserted": result.inserted,
+            "anniversaries_inserted": result.anniversaries_inserted,
+        })
+    metrics.inc("imported_diaries_total", result.inserted)
+    return result
@@ -1,33 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
-from app.models.user import User
 from app.models.monthly_photo import MonthlyPhoto
-from app.api.deps import get_current_user
+from app.api.deps import CurrentUser, MonthPath, YearPath, get_current_user, couple_etag, bump_data_version
 from app.core.config import settings
-import os
+from app.services import events, sync
+from app.services.events import event_hub
+from app.services.images import store_photo, variant_urls
+from app.services.storage import delete_urls
+from app.services.uploads import discard_staged, stage_upload, upload_slots
 import uuid
 from datetime import datetime
-from supabase import create_client, Client
 import base64
-from typing import Optional
+from typing import List, Optional
 
 router = APIRouter()
 
-def get_supabase_client() -> Optional[Client]:
-    """Create Supabase client if credentials are available"""
-    if settings.SUPABASE_URL and settings.SUPABASE_KEY:
-        return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-    return None
-
 @router.post("/upload/{year}/{month}")
 async def upload_monthly_photo(
-    year: int,
-    month: int,
     request: Request,
+    year: int = YearPath,
+    month: int = MonthPath,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Upload a photo for a specific month"""
     if not current_user.partner_id:
@@ -37,62 +34,33 @@ async def upload_monthly_photo(
         )
     
     # Create couple_id (always smaller ID first for consistency)
-    couple_id = f"{min(current_user.id, current_user.partner_id)}_{max(current_user.id, current_user.partner_id)}"
+    couple_id = get_couple_id(current_user.id, current_user.partner_id)
     
     # Check if photo already exists for this month
-    existing_photo = db.query(MonthlyPhoto).filter(
+    result = await db.execute(select(MonthlyPhoto).where(
         MonthlyPhoto.couple_id == couple_id,
         MonthlyPhoto.year == year,
         MonthlyPhoto.month == month
-    ).first()
+    ))
+    existing_photo = result.scalars().first()
     
-    # Read file content
-    content = await file.read()
+    file_extension = file.filename.split(".")[-1]
+    key = f"monthly/{couple_id}_{year}_{month}_{uuid.uuid4()}.{file_extension}"
     
-    # Try to use Supabase Storage first
-    supabase = get_supabase_client()
-    print(f"Supabase client created: {supabase is not None}")
-    if supabase:
+    # Copy to a temp file in chunks instead of reading it into memory
+    async with upload_slots():
+        staged = await stage_upload(file)
         try:
-            # If photo exists, delete the old file
-            if existing_photo:
-                # Extract file name from URL
-                old_file_name = existing_photo.photo_url.split("/")[-1]
-                if existing_photo.photo_url.startswith("https://"):
-                    # It's a Supabase URL, delete from storage
-                    try:
-                        supabase.storage.from_("photos").remove([f"monthly/{old_file_name}"])
-                    except:
-                        pass  # Ignore deletion errors
-                
-                # Delete the database entry
-                db.delete(existing_photo)
-                db.commit()
-            
-            # Generate file name
-            file_extension = file.filename.split(".")[-1]
-            file_name = f"{couple_id}_{year}_{month}_{uuid.uuid4()}.{file_extension}"
-            file_path = f"monthly/{file_name}"
-            
-            # Upload to Supabase Storage
-            response = supabase.storage.from_("photos").upload(
-                file_path,
-                content,
-                file_options={"content-type": file.content_type}
-            )
-            
-            # Get public URL
-            photo_url = supabase.storage.from_("photos").get_public_url(file_path)
-            
-        except Exception as e:
-            import traceback
-            print(f"Supabase storage error: {str(e)}")
-            print(f"Full traceback:\n{traceback.format_exc()}")
-            # Fall back to local storage
-            photo_url = await save_to_local_storage(couple_id, year, month, file, content, existing_photo, db)
-    else:
-        # Use local storage
-        photo_url = await save_to_local_storage(couple_id, year, month, file, content, existing_photo, db)
+            photo_url, variants = await store_photo(key, staged, file.content_type)
+        finally:
+            await discard_staged(staged)
+    
+    old_photo_urls = []
+    if existing_photo:
+        # Replace the old row in the same transaction that adds the new one
+        old_photo_urls = [existing_photo.photo_url, *variant_urls(existing_photo.variants)]
+        await db.delete(existing_photo)
+        sync.record_deletion(db, sync.MONTHLY_PHOTO, existing_photo.id, [current_user.id, current_user.partner_id])
     
     # Create database entry
     monthly_photo = MonthlyPhoto(
@@ -100,89 +68,87 @@ async def upload_monthly_photo(
         month=month,
         couple_id=couple_id,
         photo_url=photo_url,
+        variants=variants,
         created_by=current_user.id
     )
     
     db.add(monthly_photo)
-    db.commit()
-    db.refresh(monthly_photo)
-    
-    # Return with proper URL
-    return {
-        "id": monthly_photo.id,
-        "year": monthly_photo.year,
-        "month": monthly_photo.month,
-        "couple_id": monthly_photo.couple_id,
-        "photo_url": monthly_photo.photo_url,
-        "created_at": monthly_photo.created_at,
-        "created_by": monthly_photo.created_by
-    }
-
-async def save_to_local_storage(couple_id: str, year: int, month: int, file: UploadFile, content: bytes, existing_photo, db: Session) -> str:
-    """Fallback to local storage"""
-    # Create uploads directory if it doesn't exist
-    uploads_dir = os.path.join(os.path.dirname(__file__), "..", "..", "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
-    
-    # If photo exists, delete the old file
-    if existing_photo and not existing_photo.photo_url.startswith("https://"):
-        old_file_name = existing_photo.photo_url.split("/")[-1]
-        old_file_path = os.path.join(uploads_dir, old_file_name)
-        if os.path.exists(old_file_path):
-            os.remove(old_file_path)
-    
-    # Save file
-    file_extension = file.filename.split(".")[-1]
-    file_name = f"{couple_id}_{year}_{month}_{uuid.uuid4()}.{file_extension}"
-    file_path = os.path.join(uploads_dir, file_name)
-    
-    with open(file_path, 'wb') as f:
-        f.write(content)
+    await bump_data_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(monthly_photo)
+    # Only once nothing refers to the old file any more
+    await delete_urls(old_photo_urls)
+    event_hub.publish(
+        [current_user.id, current_user.partner_id],
+        events.PHOTO_UPDATED,
+        {"id": monthly_photo.id, "year": year, "month": month}
+    )
     
-    return f"/uploads/{file_name}"
+    return monthly_photo_response(monthly_photo, request)
 
-@router.get("/{year}/{month}")
-def get_monthly_photo(
-    year: int,
-    month: int,
+@router.get("/{year}/{month}", dependencies=[Depends(couple_etag)])
+async def get_monthly_photo(
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    year: int = YearPath,
+    month: int = MonthPath,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get photo for a specific month"""
     if not current_user.partner_id:
         return None
     
-    couple_id = f"{min(current_user.id, current_user.partner_id)}_{max(current_user.id, current_user.partner_id)}"
+    couple_id = get_couple_id(current_user.id, current_user.partner_id)
     
-    photo = db.query(MonthlyPhoto).filter(
-        MonthlyPhoto.couple_id == couple_id,
-        MonthlyPhoto.year == year,
-        MonthlyPhoto.month == month
-    ).first()
+    photos = await get_couple_monthly_photos(db, couple_id, year, month)
+    if photos:
+        return monthly_photo_response(photos[0], request)
     
-    if photo:
-        # Handle URL based on type
-        if photo.photo_url.startswith("https://"):
-            # It's already a full URL (Supabase)
-            photo_url = photo.photo_url
-        else:
-            # It's a local path, convert to full URL
-            base_url = str(request.base_url).rstrip('/')
-            # Force HTTPS in production
-            if base_url.startswith("http://") and not base_url.startswith("http://localhost"):
-                base_url = base_url.replace("http://", "https://")
-            photo_url = f"{base_url}{photo.photo_url}"
-        
-        photo_dict = {
-            "id": photo.id,
-            "year": photo.year,
-            "month": photo.month,
-            "couple_id": photo.couple_id,
-            "photo_url": photo_url,
-            "created_at": photo.created_at,
-            "created_by": photo.created_by
-        }
-        return photo_dict
+    return None
+
+def get_couple_id(user_id: int, partner_id: int) -> str:
+    """Couple key used for monthly photos (always smaller ID first)"""
+    return f"{min(user_id, partner_id)}_{max(user_id, partner_id)}"
+
+async def get_couple_monthly_photos(
+    db: AsyncSession,
+    couple_id: str,
+    year: int,
+    month: Optional[int] = None
+) -> List[MonthlyPhoto]:
+    """Monthly photos of a couple for one month, or the whole year if month is None"""
+    query = select(MonthlyPhoto).where(
+        MonthlyPhoto.couple_id == couple_id,
+        MonthlyPhoto.year == year
+    )
+    if month is not None:
+        query = query.where(MonthlyPhoto.month == month)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+def monthly_photo_response(photo: MonthlyPhoto, request: Request) -> dict:
+    # Handle URL based on type
+    if not photo.photo_url.startswith("/"):
+        # It's already a full URL (from the storage backend)
+        photo_url = photo.photo_url
+    else:
+        # Relative /uploads/ path of an older row, convert to full URL
+        base_url = str(request.base_url).rstrip('/')
+        # Force HTTPS in production
+        if base_url.startswith("http://") and not base_url.startswith("http://localhost"):
+            base_url = base_url.replace("http://", "https://")
+        photo_url = f"{base_url}{photo.photo_url}"
     
-    return photo
\ No newline at end of file
+    return {
+        "id": photo.id,
+        "year": photo.year,
+        "month": photo.month,
+        "couple_id": photo.couple_id,
+        "photo_url": photo_url,
+        # WebP copies for lists and grids; null until they have been made
+        "thumbnail_url": photo.thumbnail_url,
+        "srcset": photo.srcset,
+        "created_at": photo.created_at,
+        "updated_at": photo.updated_at,
+        "created_by": photo.created_by
+    }
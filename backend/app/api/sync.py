@@ -0,0 +1,162 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import base64
+import json
+from app.db.database import get_db
+from app.models.diary import Diary as DiaryModel
+from app.models.diary_photo import DiaryPhoto
+from app.models.monthly_photo import MonthlyPhoto
+from app.models.anniversary import Anniversary
+from app.models.sync_tombstone import SyncTombstone
+from app.schemas.sync import SyncChanges, SyncDeletion
+from app.api.deps import CurrentUser, get_current_user
+from app.api.photos import get_couple_id, monthly_photo_response
+from app.core.config import settings
+
+router = APIRouter()
+
+CURSOR_VERSION = 1
+
+Position = Tuple[datetime, int]
+
+class SyncCursor:
+    """Where a client is in each change feed.
+
+    Every feed is paged on its own (timestamp, id) key. The partner the
+    cursor was issued for is kept as well: a different partner means the
+    couple-scoped data on the device is stale and a full resync is needed.
+    """
+
+    def __init__(self, issued_at: datetime, partner_id: Optional[int], positions: Dict[str, Position]):
+        self.issued_at = issued_at
+        self.partner_id = partner_id
+        self.positions = positions
+
+    def encode(self) -> str:
+        raw = json.dumps({
+            "v": CURSOR_VERSION,
+            "t": self.issued_at.isoformat(),
+            "p": self.partner_id,
+            "k": {feed: [ts.isoformat(), row_id] for feed, (ts, row_id) in self.positions.items()},
+        }, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "SyncCursor":
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if raw["v"] != CURSOR_VERSION:
+                raise ValueError("unknown cursor version")
+            return cls(
+                issued_at=datetime.fromisoformat(raw["t"]),
+                partner_id=raw["p"],
+                positions={
+                    feed: (datetime.fromisoformat(ts), int(row_id))
+                    for feed, (ts, row_id) in raw["k"].items()
+                },
+            )
+        except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _feed_page(db: AsyncSession, query, updated_at, row_id, position: Optional[Position], settled: datetime, limit: int):
+    """One page of a change feed, oldest change first.
+
+    Returns the rows and whether more are waiting.
+    """
+    query = query.where(updated_at < settled)
+    if position is not None:
+        query = query.where(tuple_(updated_at, row_id) > tuple_(*position))
+    result = await db.execute(query.order_by(updated_at, row_id).limit(limit + 1))
+    rows = result.scalars().all()
+    return rows[:limit], len(rows) > limit
+
+@router.get("", response_model=SyncChanges)
+async def sync(
+    request: Request,
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Everything that changed for the couple since the given cursor
+
+    Without a cursor (or with reset=true in the response) the result is a
+    full snapshot. Apply deleted first, then the upserts, store the new
+    cursor, and call again while has_more is true.
+    """
+    now = datetime.utcnow()
+    cursor = SyncCursor.decode(since) if since else None
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if cursor is not None and (cursor.partner_id != current_user.partner_id or cursor.issued_at < now - retention):
+        # Partner changed, or tombstones the device still needs were pruned
+        cursor = None
+    reset = cursor is None
+
+    settled = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    # A full snapshot never contains deleted rows, so its tombstone feed
+    # only has to start where the snapshot does
+    positions = dict(cursor.positions) if cursor else {"deleted": (settled, 0)}
+    limit = settings.SYNC_PAGE_SIZE
+    author_ids = [current_user.id]
+    if current_user.partner_id:
+        author_ids.append(current_user.partner_id)
+
+    feeds = {
+        # (author_id, updated_at, id) index
+        "diaries": (
+            select(DiaryModel).where(DiaryModel.author_id.in_(author_ids)),
+            DiaryModel.updated_at, DiaryModel.id
+        ),
+        "diary_photos": (
+            select(DiaryPhoto)
+            .join(DiaryModel, DiaryModel.id == DiaryPhoto.diary_id)
+            .where(DiaryModel.author_id.in_(author_ids)),
+            DiaryPhoto.updated_at, DiaryPhoto.id
+        ),
+        "deleted": (
+            select(SyncTombstone).where(SyncTombstone.user_id == current_user.id),
+            SyncTombstone.deleted_at, SyncTombstone.id
+        ),
+    }
+    if current_user.partner_id:
+        feeds["monthly_photos"] = (
+            select(MonthlyPhoto).where(
+                MonthlyPhoto.couple_id == get_couple_id(current_user.id, current_user.partner_id)
+            ),
+            MonthlyPhoto.updated_at, MonthlyPhoto.id
+        )
+        feeds["anniversaries"] = (
+            select(Anniversary).where(
+                ((Anniversary.user_id == current_user.id) & (Anniversary.partner_id == current_user.partner_id)) |
+                ((Anniversary.user_id == current_user.partner_id) & (Anniversary.partner_id == current_user.id))
+            ),
+            Anniversary.updated_at, Anniversary.id
+        )
+
+    changes: Dict[str, List] = {}
+    has_more = False
+    for feed, (query, updated_at, row_id) in feeds.items():
+        rows, more = await _feed_page(db, query, updated_at, row_id, positions.get(feed), settled, limit)
+        has_more = has_more or more
+        if rows:
+            last = rows[-1]
+            positions[feed] = (getattr(last, updated_at.key), last.id)
+        changes[feed] = rows
+
+    next_cursor = SyncCursor(now, current_user.partner_id, positions)
+    return SyncChanges(
+        cursor=next_cursor.encode(),
+        has_more=has_more,
+        reset=reset,
+        user=current_user,
+        diaries=changes["diaries"],
+        diary_photos=changes["diary_photos"],
+        monthly_photos=[monthly_photo_response(photo, request) for photo in changes.get("monthly_photos", [])],
+        anniversaries=changes.get("anniversaries", []),
+        deleted=[
+            SyncDeletion(entity=tombstone.entity, id=tombstone.entity_id, deleted_at=tombstone.deleted_at)
+            for tombstone in changes["deleted"]
+        ],
+    )
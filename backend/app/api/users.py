@@ -1,54 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from app.db.database import get_db
 from app.models.user import User, PartnerRequest
-from app.schemas.user import User as UserSchema, UserUpdate, PartnerRequest as PartnerRequestSchema, PartnerRequestCreate, PushSubscription
-from app.api.deps import get_current_user
+from app.models.push_subscription import PushSubscription as PushSubscriptionModel
+from app.schemas.user import User as UserSchema, UserUpdate, PartnerRequest as PartnerRequestSchema, PartnerRequestCreate, PushSubscription, PushUnsubscribe
+from app.api.deps import CurrentUser, get_current_user, invalidate_principal, bump_data_version
+from app.services import events
+from app.services.events import event_hub
+import hashlib
 import json
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
-def get_me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if current_user.partner_id:
-        partner = db.query(User).filter(User.id == current_user.partner_id).first()
-        current_user.partner = partner
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
+    # The cached principal already carries the partner snapshot
     return current_user
 
 @router.put("/me", response_model=UserSchema)
-def update_me(
+async def update_me(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
+    user = await db.get(User, current_user.id)
     if user_update.name is not None:
-        current_user.name = user_update.name
+        user.name = user_update.name
     if user_update.reminder_time is not None:
-        current_user.reminder_time = user_update.reminder_time
+        user.reminder_time = user_update.reminder_time
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    # Names are shown in the couple's day views
+    await bump_data_version(db, user.id)
+    await db.commit()
+    await db.refresh(user)
+    # The partner's snapshot embeds this user as well
+    invalidate_principal(user.id, user.partner_id)
+    event_hub.publish([user.partner_id], events.PARTNER_UPDATED, {"id": user.id, "name": user.name})
+    return user
 
 @router.get("/search")
-def search_users(
+async def search_users(
     email: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    users = db.query(User).filter(
+    result = await db.execute(select(User).where(
         User.email.contains(email),
         User.id != current_user.id
-    ).limit(10).all()
+    ).limit(10))
+    users = result.scalars().all()
     
     return [{"id": u.id, "email": u.email, "name": u.name} for u in users]
 
 @router.post("/partner-request", response_model=PartnerRequestSchema)
-def send_partner_request(
+async def send_partner_request(
     request: PartnerRequestCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     # Check if already has partner
     if current_user.partner_id:
@@ -58,7 +70,8 @@ def send_partner_request(
         )
     
     # Find recipient
-    recipient = db.query(User).filter(User.email == request.recipient_email).first()
+    result = await db.execute(select(User).where(User.email == request.recipient_email))
+    recipient = result.scalar_one_or_none()
     if not recipient:
         raise HTTPException(
             status_code=404,
@@ -72,11 +85,12 @@ def send_partner_request(
         )
     
     # Check if request already exists
-    existing_request = db.query(PartnerRequest).filter(
+    result = await db.execute(select(PartnerRequest).where(
         ((PartnerRequest.requester_id == current_user.id) & (PartnerRequest.recipient_id == recipient.id)) |
         ((PartnerRequest.requester_id == recipient.id) & (PartnerRequest.recipient_id == current_user.id)),
         PartnerRequest.status == "pending"
-    ).first()
+    ))
+    existing_request = result.scalars().first()
     
     if existing_request:
         raise HTTPException(
@@ -90,34 +104,44 @@ def send_partner_request(
         recipient_id=recipient.id
     )
     db.add(partner_request)
-    db.commit()
-    db.refresh(partner_request)
+    await db.commit()
+    event_hub.publish([recipient.id], events.PARTNER_REQUESTED, {"id": partner_request.id, "requester_id": current_user.id})
     
-    return partner_request
+    # Reload with both users for the response model
+    result = await db.execute(select(PartnerRequest).options(
+        selectinload(PartnerRequest.requester),
+        selectinload(PartnerRequest.recipient)
+    ).where(PartnerRequest.id == partner_request.id))
+    return result.scalar_one()
 
 @router.get("/partner-requests", response_model=List[PartnerRequestSchema])
-def get_partner_requests(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_partner_requests(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    requests = db.query(PartnerRequest).filter(
+    result = await db.execute(select(PartnerRequest).options(
+        selectinload(PartnerRequest.requester),
+        selectinload(PartnerRequest.recipient)
+    ).where(
         (PartnerRequest.recipient_id == current_user.id) | (PartnerRequest.requester_id == current_user.id),
         PartnerRequest.status == "pending"
-    ).all()
+    ))
+    requests = result.scalars().all()
     
     return requests
 
 @router.put("/partner-request/{request_id}/accept")
-def accept_partner_request(
+async def accept_partner_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    partner_request = db.query(PartnerRequest).filter(
+    result = await db.execute(select(PartnerRequest).where(
         PartnerRequest.id == request_id,
         PartnerRequest.recipient_id == current_user.id,
         PartnerRequest.status == "pending"
-    ).first()
+    ))
+    partner_request = result.scalars().first()
     
     if not partner_request:
         raise HTTPException(
@@ -129,33 +153,38 @@ def accept_partner_request(
     partner_request.status = "accepted"
     
     # Connect users
-    current_user.partner_id = partner_request.requester_id
-    requester = db.query(User).filter(User.id == partner_request.requester_id).first()
+    user = await db.get(User, current_user.id)
+    user.partner_id = partner_request.requester_id
+    requester = await db.get(User, partner_request.requester_id)
     requester.partner_id = current_user.id
     
     # Reject all other pending requests for both users
-    db.query(PartnerRequest).filter(
+    await db.execute(update(PartnerRequest).where(
         ((PartnerRequest.requester_id == current_user.id) | (PartnerRequest.recipient_id == current_user.id) |
          (PartnerRequest.requester_id == requester.id) | (PartnerRequest.recipient_id == requester.id)),
         PartnerRequest.status == "pending",
         PartnerRequest.id != request_id
-    ).update({"status": "rejected"})
+    ).values(status="rejected").execution_options(synchronize_session=False))
     
-    db.commit()
+    await db.commit()
+    invalidate_principal(current_user.id, requester.id)
+    event_hub.publish([requester.id], events.PARTNER_CONNECTED, {"partner_id": current_user.id})
+    event_hub.publish([current_user.id], events.PARTNER_CONNECTED, {"partner_id": requester.id})
     
     return {"message": "Partner request accepted"}
 
 @router.put("/partner-request/{request_id}/reject")
-def reject_partner_request(
+async def reject_partner_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    partner_request = db.query(PartnerRequest).filter(
+    result = await db.execute(select(PartnerRequest).where(
         PartnerRequest.id == request_id,
         PartnerRequest.recipient_id == current_user.id,
         PartnerRequest.status == "pending"
-    ).first()
+    ))
+    partner_request = result.scalars().first()
     
     if not partner_request:
         raise HTTPException(
@@ -164,80 +193,131 @@ def reject_partner_request(
         )
     
     partner_request.status = "rejected"
-    db.commit()
+    await db.commit()
+    invalidate_principal(partner_request.requester_id, partner_request.recipient_id)
+    event_hub.publish([partner_request.requester_id], events.PARTNER_REJECTED, {"id": partner_request.id})
     
     return {"message": "Partner request rejected"}
 
 @router.post("/push-subscription")
-def save_push_subscription(
+async def save_push_subscription(
     subscription: PushSubscription,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    current_user.push_subscription = json.dumps(subscription.dict())
-    db.commit()
+    """Register this device for push; a user can have several devices"""
+    endpoint_hash = _endpoint_hash(subscription.endpoint)
+    values = {
+        "user_id": current_user.id,
+        "endpoint": subscription.endpoint,
+        "subscription_info": json.dumps(subscription.dict()),
+    }
+    # The same browser may re-subscribe (new keys) or switch accounts
+    for _ in range(2):
+        result = await db.execute(
+            update(PushSubscriptionModel)
+            .where(PushSubscriptionModel.endpoint_hash == endpoint_hash)
+            .values(**values)
+        )
+        if result.rowcount == 0:
+            db.add(PushSubscriptionModel(endpoint_hash=endpoint_hash, **values))
+        try:
+            await db.commit()
+            break
+        except IntegrityError:
+            # Another request inserted the same endpoint first; update it instead
+            await db.rollback()
     
     return {"message": "Push subscription saved"}
 
+@router.delete("/push-subscription")
+async def delete_push_subscription(
+    subscription: PushUnsubscribe,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Unregister one device, e.g. when the user turns notifications off"""
+    await db.execute(delete(PushSubscriptionModel).where(
+        PushSubscriptionModel.endpoint_hash == _endpoint_hash(subscription.endpoint),
+        PushSubscriptionModel.user_id == current_user.id
+    ))
+    await db.commit()
+    
+    return {"message": "Push subscription removed"}
+
+def _endpoint_hash(endpoint: str) -> str:
+    return hashlib.sha256(endpoint.encode()).hexdigest()
+
 @router.delete("/partner/disconnect")
-def disconnect_partner(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def disconnect_partner(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     if not current_user.partner_id:
         raise HTTPException(status_code=400, detail="No partner connected")
     
     # Get partner
-    partner = db.query(User).filter(User.id == current_user.partner_id).first()
+    partner = await db.get(User, current_user.partner_id)
     if not partner:
         raise HTTPException(status_code=404, detail="Partner not found")
     
     # Disconnect both users
-    current_user.partner_id = None
+    user = await db.get(User, current_user.id)
+    user.partner_id = None
     partner.partner_id = None
     
     # Delete all partner requests between them
-    db.query(PartnerRequest).filter(
+    await db.execute(delete(PartnerRequest).where(
         ((PartnerRequest.requester_id == current_user.id) & (PartnerRequest.recipient_id == partner.id)) |
         ((PartnerRequest.requester_id == partner.id) & (PartnerRequest.recipient_id == current_user.id))
-    ).delete()
+    ).execution_options(synchronize_session=False))
     
-    db.commit()
+    await db.commit()
+    invalidate_principal(current_user.id, partner.id)
+    event_hub.publish([current_user.id, partner.id], events.PARTNER_DISCONNECTED, {})
     
     return {"message": "Partner disconnected successfully"}
 
 @router.delete("/account")
-def delete_account(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def delete_account(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     # If user has a partner, disconnect first
     if current_user.partner_id:
-        partner = db.query(User).filter(User.id == current_user.partner_id).first()
+        partner = await db.get(User, current_user.partner_id)
         if partner:
             partner.partner_id = None
+            await db.flush()
     
     # Delete all user's diaries
     from app.models.diary import Diary
-    db.query(Diary).filter(Diary.user_id == current_user.id).delete()
+    await db.execute(delete(Diary).where(Diary.author_id == current_user.id).execution_options(synchronize_session=False))
     
     # Delete all user's monthly photos
     from app.models.monthly_photo import MonthlyPhoto
-    db.query(MonthlyPhoto).filter(MonthlyPhoto.user_id == current_user.id).delete()
+    await db.execute(delete(MonthlyPhoto).where(MonthlyPhoto.created_by == current_user.id).execution_options(synchronize_session=False))
     
     # Delete all user's anniversaries
     from app.models.anniversary import Anniversary
-    db.query(Anniversary).filter(
+    await db.execute(delete(Anniversary).where(
         (Anniversary.user_id == current_user.id) | (Anniversary.partner_id == current_user.id)
-    ).delete()
+    ).execution_options(synchronize_session=False))
     
     # Delete all partner requests
-    db.query(PartnerRequest).filter(
+    await db.execute(delete(PartnerRequest).where(
         (PartnerRequest.requester_id == current_user.id) | (PartnerRequest.recipient_id == current_user.id)
-    ).delete()
+    ).execution_options(synchronize_session=False))
+    
+    # Delete all push subscriptions
+    await db.execute(delete(PushSubscriptionModel).where(
+        PushSubscriptionModel.user_id == current_user.id
+    ).execution_options(synchronize_session=False))
     
-    # Delete the user
-    db.delete(current_user)
-    db.commit()
+    # Delete the user (bulk delete avoids lazy-loading relationships on the async session)
+    await db.execute(delete(User).where(User.id == current_user.id).execution_options(synchronize_session=False))
+    await db.commit()
+    invalidate_principal(current_user.id, current_user.partner_id)
+    event_hub.publish([current_user.partner_id], events.PARTNER_DISCONNECTED, {})
     
     return {"message": "Account deleted successfully"}
\ No newline at end of file
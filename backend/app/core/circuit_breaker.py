@@ -0,0 +1,68 @@
+import time
+from app.core.metrics import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Gauge values for {name}_breaker_state
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitBreaker:
+    """Stop calling a failing dependency for a while.
+
+    After failure_threshold consecutive failures the breaker opens and
+    allow() returns False for cooldown seconds. Then a single probe call
+    is let through: success closes the breaker, failure opens it again.
+    Used from the event loop only, so no locking.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self._publish()
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self._opened_at < self.cooldown:
+                return False
+            self._set_state(HALF_OPEN)
+            self._probe_started_at = now
+            return True
+        # Half open: one probe at a time; a probe that never reported back
+        # (e.g. cancelled) is replaced after another cool-down
+        if now - self._probe_started_at < self.cooldown:
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        metrics.inc(f"{self.name}_failures_total")
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                metrics.inc(f"{self.name}_breaker_opened_total")
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            print(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge(f"{self.name}_breaker_state", _STATE_GAUGE[self.state])
@@ -0,0 +1,66 @@
+import hashlib
+from typing import Optional
+
+# Bump when the payload shape of an ETag-enabled route changes, so clients
+# holding a response from the previous release do not get a 304 for it
+ETAG_SCHEMA = "2"
+
+class NotModified(Exception):
+    """Raised by an ETag dependency when the client's copy is still current"""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+def make_etag(*parts: str) -> str:
+    digest = hashlib.sha1("|".join((ETAG_SCHEMA,) + parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+class ConditionalGetMiddleware:
+    """Adds validator headers to responses of routes that set request.state.etag
+
+    A route opts in through a dependency that computes the ETag, stores it
+    on request.state and raises NotModified when If-None-Match matches
+    (see app.api.deps.couple_etag). Responses vary by user, so they are
+    only cached privately and always revalidated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                etag = scope.get("state", {}).get("etag")
+                if etag:
+                    headers = [
+                        (name, value) for name, value in message.get("headers", [])
+                        if name.lower() not in (b"etag", b"cache-control")
+                    ]
+                    headers += [
+                        (b"etag", etag.encode("latin-1")),
+                        (b"cache-control", b"private, no-cache"),
+                        (b"vary", b"Authorization"),
+                    ]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
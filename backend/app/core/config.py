@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
@@ -10,6 +10,62 @@ class Settings(BaseSettings):
     VAPID_PUBLIC_KEY: Optional[str] = None
     SUPABASE_URL: Optional[str] = None
     SUPABASE_KEY: Optional[str] = None
+    # Where photos are written: auto (Supabase if configured, local disk
+    # as fallback), local, or memory (tests and offline benchmarks)
+    STORAGE_BACKEND: str = "auto"
+    # Public base URL of this API; locally stored photos are served below it
+    BASE_URL: str = "http://localhost:8000"
+    STORAGE_TIMEOUT_SECONDS: float = 10.0
+    # Consecutive storage failures before uploads go straight to local disk,
+    # and how long to wait before probing Supabase again
+    STORAGE_BREAKER_FAILURES: int = 5
+    STORAGE_BREAKER_COOLDOWN_SECONDS: float = 30.0
+    BLOCKING_POOL_SIZE: int = 8
+    # Bearer token for GET /metrics; the endpoint is disabled while unset
+    METRICS_TOKEN: Optional[str] = None
+    LOOP_LAG_INTERVAL_MS: int = 250
+    LOOP_LAG_THRESHOLD_MS: int = 100
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PUSH_WORKERS: int = 4
+    PUSH_QUEUE_SIZE: int = 10000
+    PUSH_MAX_RETRIES: int = 3
+    PUSH_RETRY_BACKOFF_SECONDS: float = 1.0
+    PUSH_TIMEOUT_SECONDS: float = 10.0
+    PUSH_MAX_CONNECTIONS_PER_ORIGIN: int = 20
+    PUSH_SUCCESS_FLUSH_SECONDS: float = 30.0
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    # Lifetime of the ?token= for /api/events; it only has to survive until the stream opens
+    EVENTS_TOKEN_EXPIRE_MINUTES: int = 5
+    INVALIDATION_CHANNEL: str = "lovary_cache_invalidation"
+    INVALIDATION_KEEPALIVE_SECONDS: float = 30.0
+    REMINDERS_ENABLED: bool = True
+    # Time zone User.reminder_time is interpreted in
+    REMINDER_TIMEZONE: str = "UTC"
+    REMINDER_BATCH_SIZE: int = 1000
+    # How far back a reminder tick catches up on minutes missed while the
+    # previous tick was still running
+    REMINDER_CATCHUP_MINUTES: int = 15
+    # Hour (in REMINDER_TIMEZONE) of the daily "on this day" push
+    MEMORIES_PUSH_HOUR: int = 9
+    UPLOAD_CHUNK_BYTES: int = 256 * 1024
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    # Concurrent storage uploads per request and per worker; kept below
+    # BLOCKING_POOL_SIZE so uploads cannot starve other blocking calls
+    PHOTO_UPLOADS_PER_REQUEST: int = 3
+    PHOTO_UPLOAD_CONCURRENCY: int = 4
+    # Bounding boxes of the WebP copies made of every photo (srcset widths)
+    PHOTO_VARIANT_WIDTHS: List[int] = [256, 1024]
+    PHOTO_VARIANT_QUALITY: int = 80
+    # Worker processes per API worker for resizing photos
+    IMAGE_PROCESS_WORKERS: int = 2
+    SYNC_PAGE_SIZE: int = 500
+    # Rows younger than this are left for the next /sync call, so a slower
+    # transaction that commits an older updated_at is never skipped
+    SYNC_SETTLE_SECONDS: float = 2.0
+    # Cursors older than this get a full resync; tombstones are pruned after it
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 90
 
     class Config:
         env_file = ".env"
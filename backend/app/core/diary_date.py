@@ -0,0 +1,17 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+# A diary day stays open for writing until 6 AM (UTC) the next morning
+WRITE_CUTOFF_HOUR = 6
+
+def logical_diary_date(moment: Optional[datetime] = None) -> date:
+    """Diary day a moment belongs to, honouring the 6 AM cutoff"""
+    moment = moment or datetime.utcnow()
+    if moment.hour < WRITE_CUTOFF_HOUR:
+        return (moment - timedelta(days=1)).date()
+    return moment.date()
+
+def can_write_diary(diary_date: date) -> bool:
+    """Check if a diary for the given day can still be written or edited"""
+    cutoff = datetime.combine(diary_date + timedelta(days=1), datetime.min.time()).replace(hour=WRITE_CUTOFF_HOUR)
+    return datetime.utcnow() <= cutoff
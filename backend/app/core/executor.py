@@ -0,0 +1,75 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Bounded pool for blocking calls (storage SDKs, file I/O, bcrypt, web push)
+# so they never run on the event loop. Created on first use, so the app can
+# start again after shutdown_executor() (tests run several app lifespans).
+_executor: Optional[ThreadPoolExecutor] = None
+
+# CPU-bound work (image resizing) runs in separate processes so it holds
+# neither the event loop nor the GIL. Created on first use; spawned rather
+# than forked, since forking a process with running threads can deadlock.
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable in the bounded thread pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BLOCKING_POOL_SIZE,
+            thread_name_prefix="lovary-blocking",
+        )
+    return _executor
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+def _discard_broken_pool(pool: ProcessPoolExecutor):
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def run_in_process(func, *args, **kwargs):
+    """Run a CPU-bound, picklable callable in the process pool and await its result
+
+    A worker that dies (e.g. OOM-killed on a huge image) breaks the whole
+    pool; it is then replaced and the call retried once.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    for attempt in range(2):
+        pool = _get_process_pool()
+        try:
+            return await loop.run_in_executor(pool, call)
+        except BrokenProcessPool:
+            print("Process pool broke, starting a new one")
+            metrics.inc("process_pool_restarts_total")
+            _discard_broken_pool(pool)
+            if attempt:
+                raise
+
+def shutdown_executor():
+    global _executor, _process_pool
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
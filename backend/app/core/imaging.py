@@ -0,0 +1,48 @@
+"""Image resizing that runs in worker processes.
+
+Kept free of app imports so a freshly spawned worker only loads Pillow.
+"""
+import hashlib
+import os
+import uuid
+from typing import List, Sequence
+from PIL import Image, ImageOps
+
+def render_webp_variants(source: str, out_dir: str, widths: Sequence[int], quality: int) -> List[dict]:
+    """Write downscaled WebP copies of an image to out_dir.
+
+    Each variant fits in a width x width box, is rotated according to its
+    EXIF orientation and carries no EXIF metadata (no GPS, no camera
+    data); only the colour profile is kept. Images are never upscaled, so
+    a small original may yield fewer variants than widths. Returns one
+    dict per written file: width, height, path, size and sha256.
+    Raises if source is not a readable image.
+    """
+    variants = []
+    with Image.open(source) as original:
+        # Lets JPEG decode at a reduced scale instead of full resolution
+        original.draft("RGB", (max(widths), max(widths)))
+        icc_profile = original.info.get("icc_profile")
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        seen = set()
+        for width in sorted(widths):
+            variant = image.copy()
+            variant.thumbnail((width, width), Image.Resampling.LANCZOS)
+            if variant.size in seen:
+                continue
+            seen.add(variant.size)
+            path = os.path.join(out_dir, f"{uuid.uuid4().hex}.webp")
+            variant.save(path, "WEBP", quality=quality, method=4, icc_profile=icc_profile)
+            with open(path, "rb") as f:
+                data = f.read()
+            variants.append({
+                "width": variant.width,
+                "height": variant.height,
+                "path": path,
+                "size": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+            })
+    return variants
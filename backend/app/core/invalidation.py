@@ -0,0 +1,204 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import async_engine
+
+# NOTIFY payloads must stay under 8000 bytes
+MAX_KEYS_PER_MESSAGE = 500
+MAX_BROADCAST_BYTES = 7500
+
+class LocalInvalidationBus:
+    """Evicts keys from this process's caches only.
+
+    Used when there is no Postgres to carry messages (local SQLite, tests);
+    with a single worker that is all the invalidation needed.
+    """
+
+    def __init__(self):
+        self._caches: Dict[str, TTLCache] = {}
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+
+    def register(self, cache: TTLCache):
+        self._caches[cache.name] = cache
+
+    def add_handler(self, kind: str, handler: Callable[[dict], None]):
+        """Have handler called with every message broadcast under kind"""
+        self._handlers[kind] = handler
+
+    def broadcast(self, kind: str, message: dict):
+        """Hand message to the kind's handler here and in every other worker"""
+        self._dispatch(kind, message)
+
+    def publish(self, cache_name: str, keys: Iterable):
+        """Evict keys here and in every other worker; call after the write commits"""
+        keys = [key for key in keys if key is not None]
+        if keys:
+            self._evict(cache_name, keys)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def _dispatch(self, kind: str, message: dict):
+        handler = self._handlers.get(kind)
+        if handler is not None:
+            handler(message)
+
+    def _evict(self, cache_name: str, keys: List):
+        cache = self._caches.get(cache_name)
+        if cache is None:
+            return
+        for key in keys:
+            cache.pop(key)
+
+class PostgresInvalidationBus(LocalInvalidationBus):
+    """Fans evictions and broadcasts out to every worker over Postgres LISTEN/NOTIFY.
+
+    Each worker holds one dedicated connection that LISTENs on the channel
+    and also sends this worker's NOTIFYs. Writers never wait on it. While
+    that connection is down, messages can be missed, so every registered
+    cache is cleared when it comes back; broadcasts sent meanwhile are
+    simply lost.
+    """
+
+    def __init__(self, channel: str, keepalive: float):
+        super().__init__()
+        self.channel = channel
+        self.keepalive = keepalive
+        # Lets a worker skip its own messages; it already evicted locally
+        self.origin = uuid.uuid4().hex
+        self._outbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._outbox = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def publish(self, cache_name: str, keys: Iterable):
+        keys = [key for key in keys if key is not None]
+        if not keys:
+            return
+        self._evict(cache_name, keys)
+        if self._outbox is None:
+            return
+        for start in range(0, len(keys), MAX_KEYS_PER_MESSAGE):
+            self._outbox.put_nowait(json.dumps({
+                "cache": cache_name,
+                "keys": keys[start:start + MAX_KEYS_PER_MESSAGE],
+                "origin": self.origin,
+                "sent_at": time.time(),
+            }))
+        metrics.inc("invalidations_published_total")
+
+    def broadcast(self, kind: str, message: dict):
+        self._dispatch(kind, message)
+        if self._outbox is None:
+            return
+        payload = json.dumps({
+            "kind": kind,
+            "message": message,
+            "origin": self.origin,
+            "sent_at": time.time(),
+        }, default=str)
+        if len(payload.encode()) > MAX_BROADCAST_BYTES:
+            # pg_notify would fail and take the connection down with it
+            metrics.inc("broadcasts_oversized_total")
+            print(f"Not broadcasting {kind} to other workers, payload is {len(payload)} bytes")
+            return
+        self._outbox.put_nowait(payload)
+        metrics.inc("broadcasts_published_total")
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await self._listen()
+                backoff = 1.0
+                await self._send_loop(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.inc("invalidation_bus_errors_total")
+                print(f"Invalidation bus connection lost: {e}")
+            finally:
+                if conn is not None:
+                    # Never hand a connection with a listener back to the pool
+                    try:
+                        await conn.invalidate()
+                    except Exception:
+                        pass
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _listen(self) -> AsyncConnection:
+        conn = await async_engine.connect()
+        try:
+            # No transaction, so the connection never idles in one and NOTIFY goes out at once
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(self.channel, self._on_notify)
+        except Exception:
+            await conn.invalidate()
+            raise
+        # Anything sent while we were not listening is lost
+        for cache in self._caches.values():
+            cache.clear()
+        return conn
+
+    async def _send_loop(self, conn: AsyncConnection):
+        while True:
+            try:
+                payload = await asyncio.wait_for(self._outbox.get(), self.keepalive)
+            except asyncio.TimeoutError:
+                # Notices a dead connection even when nothing is being published
+                await conn.execute(text("SELECT 1"))
+                continue
+            await conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": payload}
+            )
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") == self.origin:
+            return
+        if "kind" in message:
+            try:
+                self._dispatch(message["kind"], message["message"])
+            except Exception as e:
+                print(f"Could not handle {message['kind']} broadcast: {e}")
+            metrics.inc("broadcasts_received_total")
+            return
+        self._evict(message["cache"], message["keys"])
+        metrics.inc("invalidations_received_total")
+        metrics.observe("invalidation_lag_seconds", max(0.0, time.time() - message["sent_at"]))
+
+def _create_bus() -> LocalInvalidationBus:
+    if async_engine.dialect.name == "postgresql":
+        return PostgresInvalidationBus(settings.INVALIDATION_CHANNEL, settings.INVALIDATION_KEEPALIVE_SECONDS)
+    return LocalInvalidationBus()
+
+invalidation_bus = _create_bus()
@@ -0,0 +1,91 @@
+import asyncio
+import itertools
+import time
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Requests currently being served by this worker: id -> (route, start time)
+_inflight: Dict[int, Tuple[str, float]] = {}
+_request_ids = itertools.count()
+
+class InflightRequestMiddleware:
+    """Track in-flight requests so a loop stall can be attributed to a route
+
+    Server-sent event streams stop being tracked once their response
+    starts: they stay open for hours and would always head the
+    oldest-first stall report, hiding the handler that blocked.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(_request_ids)
+        _inflight[request_id] = (f"{scope['method']} {scope['path']}", time.monotonic())
+
+        async def send_untracking_streams(message):
+            if message["type"] == "http.response.start" and _is_event_stream(message):
+                _inflight.pop(request_id, None)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_untracking_streams)
+        finally:
+            _inflight.pop(request_id, None)
+
+def _is_event_stream(message: dict) -> bool:
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.startswith(b"text/event-stream")
+    return False
+
+def inflight_routes() -> list:
+    """In-flight routes, oldest first"""
+    now = time.monotonic()
+    return [
+        f"{route} ({(now - started) * 1000:.0f}ms)"
+        for route, started in sorted(_inflight.values(), key=lambda item: item[1])
+    ]
+
+class LoopLagMonitor:
+    """Background task that measures how late the event loop wakes it up"""
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            metrics.observe("event_loop_lag_seconds", lag)
+            if lag > self.threshold:
+                metrics.inc("event_loop_stalls_total")
+                routes = inflight_routes()
+                print(f"Event loop stalled for {lag * 1000:.0f}ms; in-flight: {', '.join(routes) or 'none'}")
+
+loop_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL_MS / 1000,
+    threshold=settings.LOOP_LAG_THRESHOLD_MS / 1000,
+)
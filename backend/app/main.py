@@ -1,9 +1,22 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from app.api import auth, diary, users, photos, anniversary
+from fastapi.responses import JSONResponse, Response
+from app.api import auth, diary, users, photos, anniversary, calendar, events, export, imports, sync
+from app.core.conditional import ConditionalGetMiddleware, NotModified
 from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.invalidation import invalidation_bus
+from app.core.loop_monitor import InflightRequestMiddleware, loop_monitor
+from app.core.metrics import metrics
+from app.services.push_queue import push_dispatcher
+from app.services.push_notification import close_push_transport
+from app.services.reminders import reminder_scheduler
+from app.services.events import event_hub
+from app.services.storage import supabase_storage
+from app.services.uploads import cleanup_incoming
 import os
+import secrets
+from typing import Optional
 
 app = FastAPI(title="Lovary API")
 
@@ -18,6 +31,13 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.add_middleware(InflightRequestMiddleware)
+app.add_middleware(ConditionalGetMiddleware)
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    # Validator headers are added by ConditionalGetMiddleware
+    return Response(status_code=304)
 
 @app.exception_handler(422)
 async def validation_exception_handler(request: Request, exc):
@@ -42,29 +62,68 @@ app.include_router(diary.router, prefix="/api/diary", tags=["diary"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(photos.router, prefix="/api/photos", tags=["photos"])
 app.include_router(anniversary.router, prefix="/api/anniversary", tags=["anniversary"])
+app.include_router(calendar.router, prefix="/api/calendar", tags=["calendar"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(imports.router, prefix="/api/import", tags=["import"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
+
+@app.on_event("startup")
+async def startup():
+    loop_monitor.start()
+    invalidation_bus.start()
+    push_dispatcher.start()
+    reminder_scheduler.start()
+    await run_blocking(cleanup_incoming)
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.db.database import async_engine
+    from app.core.executor import shutdown_executor
+    event_hub.close()
+    await reminder_scheduler.stop()
+    await push_dispatcher.stop()
+    await close_push_transport()
+    await supabase_storage.close()
+    await invalidation_bus.stop()
+    await loop_monitor.stop()
+    await async_engine.dispose()
+    shutdown_executor()
 
 @app.get("/")
 def root():
     return {"message": "Lovary API"}
 
+@app.get("/metrics")
+def get_metrics(authorization: Optional[str] = Header(None)):
+    """Counters and latencies for monitoring; needs "Bearer <METRICS_TOKEN>"
+
+    Disabled (404) while METRICS_TOKEN is unset, so route timings are never public.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not authorization or not secrets.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return metrics.snapshot()
+
 @app.get("/health")
-def health_check():
-    from app.db.database import SessionLocal
+async def health_check():
+    from app.db.database import AsyncSessionLocal
     from app.models.user import User
-    from sqlalchemy import text
+    from sqlalchemy import text, select, func
     try:
         # Test database connection
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        
-        # Count users
-        user_count = db.query(User).count()
-        
-        # Get first user email for debugging (masked)
-        first_user = db.query(User).first()
-        first_user_email = first_user.email[:3] + "***" if first_user else "No users"
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+            
+            # Count users
+            user_count = await db.scalar(select(func.count(User.id)))
+            
+            # Get first user email for debugging (masked)
+            first_user = (await db.execute(select(User).limit(1))).scalars().first()
+            first_user_email = first_user.email[:3] + "***" if first_user else "No users"
         
-        db.close()
         return {
             "status": "healthy", 
             "database": "connected",
@@ -2,4 +2,7 @@ from app.models.user import User, PartnerRequest
 from app.models.diary import Diary
 from app.models.diary_photo import DiaryPhoto
 from app.models.monthly_photo import MonthlyPhoto
-from app.models.anniversary import Anniversary
\ No newline at end of file
+from app.models.anniversary import Anniversary
+from app.models.push_subscription import PushSubscription
+from app.models.sync_tombstone import SyncTombstone
+from app.models.scheduler_state import SchedulerState
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from app.db.database import Base
 
 class Anniversary(Base):
@@ -10,6 +11,11 @@ class Anniversary(Base):
     partner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(Date, nullable=False, index=True)
     name = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User", foreign_keys=[user_id])
-    partner = relationship("User", foreign_keys=[partner_id])
\ No newline at end of file
+    partner = relationship("User", foreign_keys=[partner_id])
+
+    __table_args__ = (
+        Index("ix_anniversaries_updated_at_id", "updated_at", "id"),
+    )
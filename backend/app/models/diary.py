@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, Index, DDL, event, extract
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -10,9 +10,77 @@ class Diary(Base):
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Logical diary day (6 AM cutoff applied), fixed at insert time
+    diary_date = Column(Date, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_read_by_partner = Column(Boolean, default=False)
     
     author = relationship("User", back_populates="diaries")
-    photos = relationship("DiaryPhoto", back_populates="diary", cascade="all, delete-orphan")
\ No newline at end of file
+    photos = relationship("DiaryPhoto", back_populates="diary", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # History listings filter by author and page on (created_at, id); the
+        # included columns let summary pages be answered from the index alone
+        Index(
+            "ix_diaries_author_id_created_at_id",
+            "author_id",
+            "created_at",
+            "id",
+            postgresql_include=["title", "diary_date"],
+        ),
+        # One diary per author and day; also serves day and month lookups
+        Index("uq_diaries_author_id_diary_date", "author_id", "diary_date", unique=True),
+        # Change feed for /sync pages on (updated_at, id) per author
+        Index("ix_diaries_author_id_updated_at_id", "author_id", "updated_at", "id"),
+        # "On this day" lookups; month and day lead so the daily memories
+        # push can find every author for a day from the same index
+        Index(
+            "ix_diaries_month_day_author_id",
+            extract("month", diary_date),
+            extract("day", diary_date),
+            "author_id",
+        ),
+    )
+
+# Full-text search lives outside the ORM columns: a generated tsvector with a
+# GIN index on Postgres, an external-content FTS5 table on SQLite. The
+# 'simple' config does no stemming, which is also what Korean text needs.
+SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE diaries ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX ix_diaries_search_vector ON diaries USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE diaries_fts USING fts5(
+            title, content, content='diaries', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER diaries_fts_ai AFTER INSERT ON diaries BEGIN
+            INSERT INTO diaries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        """,
+        """
+        CREATE TRIGGER diaries_fts_ad AFTER DELETE ON diaries BEGIN
+            INSERT INTO diaries_fts(diaries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END
+        """,
+        """
+        CREATE TRIGGER diaries_fts_au AFTER UPDATE OF title, content ON diaries BEGIN
+            INSERT INTO diaries_fts(diaries_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO diaries_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Diary.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
+from app.models.photo_variants import PhotoVariants
 
-class DiaryPhoto(Base):
+class DiaryPhoto(PhotoVariants, Base):
     __tablename__ = "diary_photos"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -11,6 +12,13 @@ class DiaryPhoto(Base):
     photo_url = Column(String, nullable=False)
     original_filename = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    diary = relationship("Diary", back_populates="photos")
\ No newline at end of file
+    diary = relationship("Diary", back_populates="photos")
+
+    __table_args__ = (
+        # Same name as migrations/add_diary_photos_table.sql
+        Index("idx_diary_photos_diary_id", "diary_id"),
+        Index("ix_diary_photos_updated_at_id", "updated_at", "id"),
+    )
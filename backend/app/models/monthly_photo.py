@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from datetime import datetime
 from app.db.database import Base
+from app.models.photo_variants import PhotoVariants
 
-class MonthlyPhoto(Base):
+class MonthlyPhoto(PhotoVariants, Base):
     __tablename__ = "monthly_photos"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -11,4 +12,9 @@ class MonthlyPhoto(Base):
     couple_id = Column(String, nullable=False, index=True)  # Combination of both user IDs
     photo_url = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_monthly_photos_couple_id_updated_at_id", "couple_id", "updated_at", "id"),
+    )
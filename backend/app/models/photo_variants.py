@@ -0,0 +1,30 @@
+from typing import List, Optional
+from sqlalchemy import Column, JSON
+
+def variants_srcset(variants: Optional[List[dict]]) -> Optional[str]:
+    """An <img srcset> value such as "…w256.webp 256w, …w1024.webp 1024w" """
+    if not variants:
+        return None
+    return ", ".join(f"{v['url']} {v['width']}w" for v in sorted(variants, key=lambda v: v["width"]))
+
+def smallest_variant_url(variants: Optional[List[dict]]) -> Optional[str]:
+    if not variants:
+        return None
+    return min(variants, key=lambda v: v["width"])["url"]
+
+class PhotoVariants:
+    """Resized WebP copies stored next to a photo's original file.
+
+    variants is a list of {"width", "height", "url"}; NULL means none were
+    made yet (see backfill_photo_variants.py) and [] that the original
+    could not be decoded as an image.
+    """
+    variants = Column(JSON(none_as_null=True), nullable=True)
+
+    @property
+    def srcset(self) -> Optional[str]:
+        return variants_srcset(self.variants)
+
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return smallest_variant_url(self.variants)
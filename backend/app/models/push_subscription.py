@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.database import Base
+
+class PushSubscription(Base):
+    __tablename__ = "push_subscriptions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # sha256 of the endpoint URL; endpoints are long, so unique lookups go through the hash
+    endpoint_hash = Column(String(64), nullable=False)
+    endpoint = Column(String, nullable=False)
+    subscription_info = Column(String, nullable=False)  # JSON as sent by the browser
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_success_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    user = relationship("User", back_populates="push_subscriptions")
+
+    __table_args__ = (
+        Index("uq_push_subscriptions_endpoint_hash", "endpoint_hash", unique=True),
+        Index("ix_push_subscriptions_user_id", "user_id"),
+    )
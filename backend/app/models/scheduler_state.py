@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+from app.db.database import Base
+
+class SchedulerState(Base):
+    """Progress of a scheduled job, kept across workers and leader changes.
+
+    Only written by the worker holding the scheduler's advisory lock.
+    """
+    __tablename__ = "scheduler_state"
+
+    job = Column(String(64), primary_key=True)
+    # UTC; for reminders the first minute the next tick has to cover
+    due_from = Column(DateTime, nullable=False)
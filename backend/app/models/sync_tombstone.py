@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from datetime import datetime
+from app.db.database import Base
+
+class SyncTombstone(Base):
+    """A deleted row, kept so /sync can tell offline clients to drop it.
+
+    One row per user who could see the deleted entity.
+    """
+    __tablename__ = "sync_tombstones"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(32), nullable=False)  # e.g. "anniversary", "monthly_photo"
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_deleted_at_id", "user_id", "deleted_at", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Time, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Time, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -12,12 +12,24 @@ class User(Base):
     name = Column(String, nullable=False)
     partner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     reminder_time = Column(Time, nullable=True)
-    push_subscription = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Changes whenever this user writes something shown in calendar and day
+    # views; conditional GETs combine it with the partner's
+    data_version = Column(String(32), nullable=True)
     
     diaries = relationship("Diary", back_populates="author")
     partner_requests_sent = relationship("PartnerRequest", foreign_keys="PartnerRequest.requester_id", back_populates="requester")
     partner_requests_received = relationship("PartnerRequest", foreign_keys="PartnerRequest.recipient_id", back_populates="recipient")
+    push_subscriptions = relationship("PushSubscription", back_populates="user", passive_deletes=True)
+
+    __table_args__ = (
+        # The reminder scheduler looks up users one reminder minute at a time
+        Index(
+            "ix_users_reminder_time",
+            "reminder_time",
+            postgresql_where=reminder_time.isnot(None),
+        ),
+    )
 
 class PartnerRequest(Base):
     __tablename__ = "partner_requests"
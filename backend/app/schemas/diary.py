@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 class DiaryPhotoBase(BaseModel):
@@ -13,6 +13,9 @@ class DiaryPhoto(DiaryPhotoBase):
     id: int
     diary_id: int
     created_at: datetime
+    # WebP copies for lists and grids; null until they have been made
+    thumbnail_url: Optional[str] = None
+    srcset: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -30,6 +33,7 @@ class DiaryUpdate(DiaryBase):
 class Diary(DiaryBase):
     id: int
     author_id: int
+    diary_date: date
     created_at: datetime
     is_read_by_partner: bool
     photos: List[DiaryPhoto] = []
@@ -38,4 +42,59 @@ class Diary(DiaryBase):
         from_attributes = True
 
 class DiaryInDB(Diary):
-    pass
\ No newline at end of file
+    pass
+
+class DiaryPage(BaseModel):
+    items: List[Diary]
+    next_cursor: Optional[str] = None
+
+class DiarySummary(BaseModel):
+    id: int
+    title: str
+    diary_date: date
+    created_at: datetime
+    photo_count: int
+    first_photo_url: Optional[str] = None
+    first_photo_thumbnail_url: Optional[str] = None
+
+class DiarySummaryPage(BaseModel):
+    items: List[DiarySummary]
+    next_cursor: Optional[str] = None
+
+class DiaryImport(BaseModel):
+    title: str
+    content: str
+    diary_date: date
+    created_at: Optional[datetime] = None
+    author_id: Optional[int] = None  # present in exports; picks out my own entries
+
+class ImportResult(BaseModel):
+    processed: int = 0  # lines read; each ends up inserted, skipped or rejected
+    inserted: int = 0
+    skipped: int = 0  # day already had a diary
+    rejected: int = 0  # invalid, or a day that has not ended yet
+    anniversaries_inserted: int = 0
+    errors: List[str] = []
+
+class DiaryMemoryYear(BaseModel):
+    year: int
+    my_diary: Optional[Diary] = None
+    partner_diary: Optional[Diary] = None
+
+class DiaryMemories(BaseModel):
+    month: int
+    day: int
+    years: List[DiaryMemoryYear]
+
+class DiarySearchResult(BaseModel):
+    id: int
+    author_id: int
+    title: str
+    diary_date: date
+    created_at: datetime
+    rank: float
+    highlight: Optional[str] = None
+
+class DiarySearchPage(BaseModel):
+    items: List[DiarySearchResult]
+    next_offset: Optional[int] = None
@@ -0,0 +1,55 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import List, Optional
+from app.schemas.user import User
+from app.schemas.diary import DiaryPhoto
+from app.schemas.anniversary import Anniversary
+
+class SyncDiary(BaseModel):
+    id: int
+    title: str
+    content: str
+    author_id: int
+    diary_date: date
+    created_at: datetime
+    updated_at: datetime
+    is_read_by_partner: bool
+
+    class Config:
+        from_attributes = True
+
+class SyncDiaryPhoto(DiaryPhoto):
+    updated_at: datetime
+
+class SyncMonthlyPhoto(BaseModel):
+    id: int
+    year: int
+    month: int
+    couple_id: str
+    photo_url: str
+    thumbnail_url: Optional[str] = None
+    srcset: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    created_by: int
+
+class SyncAnniversary(Anniversary):
+    updated_at: datetime
+
+class SyncDeletion(BaseModel):
+    entity: str
+    id: int
+    deleted_at: datetime
+
+class SyncChanges(BaseModel):
+    cursor: str
+    # More changes are waiting; call again with the new cursor right away
+    has_more: bool
+    # Local data must be dropped before applying this change set
+    reset: bool
+    user: User
+    diaries: List[SyncDiary] = []
+    diary_photos: List[SyncDiaryPhoto] = []
+    monthly_photos: List[SyncMonthlyPhoto] = []
+    anniversaries: List[SyncAnniversary] = []
+    deleted: List[SyncDeletion] = []
@@ -48,4 +48,7 @@ class PartnerRequest(BaseModel):
 
 class PushSubscription(BaseModel):
     endpoint: str
-    keys: dict
\ No newline at end of file
+    keys: dict
+
+class PushUnsubscribe(BaseModel):
+    endpoint: str
\ No newline at end of file
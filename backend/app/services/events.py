@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus
+from app.core.metrics import metrics
+
+# Event types published by the write paths
+DIARY_CREATED = "diary.created"
+DIARY_UPDATED = "diary.updated"
+DIARY_READ = "diary.read"
+PHOTO_UPDATED = "photo.updated"
+ANNIVERSARY_UPDATED = "anniversary.updated"
+ANNIVERSARY_DELETED = "anniversary.deleted"
+PARTNER_REQUESTED = "partner.requested"
+PARTNER_REJECTED = "partner.rejected"
+PARTNER_CONNECTED = "partner.connected"
+PARTNER_DISCONNECTED = "partner.disconnected"
+PARTNER_UPDATED = "partner.updated"
+DIARIES_IMPORTED = "diary.imported"
+IMPORT_PROGRESS = "import.progress"
+
+# Bus message kind that carries events to the other workers
+BROADCAST_KIND = "events"
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    data: dict
+
+    def encode(self) -> str:
+        """Server-sent events wire format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int
+    queue: asyncio.Queue
+    closed: bool = field(default=False)
+
+class EventHub:
+    """Pub/sub for partner activity across workers.
+
+    Streams live in the worker that accepted them, so publish() hands the
+    event to the invalidation bus, which delivers it here and, on
+    Postgres, in every other worker through LISTEN/NOTIFY.
+
+    Each open stream gets a bounded queue. Channels are keyed by user, so
+    a couple event is published to both partners and a stream does not
+    have to re-subscribe when its user connects to or disconnects from a
+    partner. A subscriber that falls behind is dropped instead of
+    blocking publishers; its client reconnects and refetches.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.Queue(maxsize=self.queue_size))
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        metrics.set_gauge("event_subscribers", self.subscriber_count())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+        metrics.set_gauge("event_subscribers", self.subscriber_count())
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, user_ids: Iterable[Optional[int]], event_type: str, data: dict):
+        """Deliver an event to every open stream of the given users, in any worker.
+
+        Call after the write has been committed. Never blocks.
+        """
+        user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+        if not user_ids:
+            return
+        metrics.inc("events_published_total")
+        invalidation_bus.broadcast(BROADCAST_KIND, {"user_ids": user_ids, "type": event_type, "data": data})
+
+    def deliver(self, message: dict):
+        """Put a broadcast event on this worker's streams"""
+        event = None
+        for user_id in message["user_ids"]:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+            if subscriptions and event is None:
+                # Ids only need to increase within one worker's streams
+                event = Event(next(self._ids), message["type"], message["data"])
+            for subscription in subscriptions:
+                self._offer(subscription, event)
+
+    def close(self):
+        """End every open stream, e.g. on shutdown"""
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                self._offer(subscription, None)
+
+    def _offer(self, subscription: Subscription, event: Optional[Event]):
+        if subscription.closed:
+            return
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            metrics.inc("event_subscribers_dropped_total")
+            subscription.closed = True
+            self.unsubscribe(subscription)
+            # Make room for the end-of-stream marker
+            subscription.queue.get_nowait()
+            subscription.queue.put_nowait(None)
+
+event_hub = EventHub(queue_size=settings.EVENTS_QUEUE_SIZE)
+invalidation_bus.add_handler(BROADCAST_KIND, event_hub.deliver)
@@ -0,0 +1,125 @@
+import os
+import uuid
+from typing import List, Optional, Tuple
+import aiofiles.os
+from PIL import Image
+from app.core.config import settings
+from app.core.executor import run_in_process
+from app.core.imaging import render_webp_variants
+from app.core.metrics import metrics
+from app.services.storage import LocalStorage, StorageBackend, delete_urls, locate, storage
+from app.services.uploads import INCOMING_DIR, StagedUpload, discard_staged_path
+
+def variant_key(key: str, width: int) -> str:
+    """Key of a variant next to its original: a/b/photo.jpg -> a/b/photo.w256.webp"""
+    directory, _, name = key.rpartition("/")
+    stem = name.rsplit(".", 1)[0] if "." in name else name
+    return f"{directory}/{stem}.w{width}.webp" if directory else f"{stem}.w{width}.webp"
+
+async def render_variants(source: str) -> Optional[List[dict]]:
+    """Resize a local image in the process pool
+
+    Returns [] if the file is not an image Pillow can decode and None if
+    resizing failed for another reason (worth retrying later).
+    """
+    await aiofiles.os.makedirs(INCOMING_DIR, exist_ok=True)
+    try:
+        return await run_in_process(
+            render_webp_variants,
+            source,
+            INCOMING_DIR,
+            settings.PHOTO_VARIANT_WIDTHS,
+            settings.PHOTO_VARIANT_QUALITY,
+        )
+    except (OSError, Image.DecompressionBombError) as e:
+        print(f"Not making photo variants, unreadable image: {e}")
+        return []
+    except Exception as e:
+        print(f"Could not make photo variants: {e}")
+        metrics.inc("photo_variant_failures_total")
+        return None
+
+async def store_variants(backend: StorageBackend, key: str, rendered: Optional[List[dict]]) -> Optional[List[dict]]:
+    """Upload rendered variants next to key and discard the local copies
+
+    None (nothing stored) if rendering or any upload failed.
+    """
+    if rendered is None:
+        return None
+    variants = []
+    try:
+        for item in rendered:
+            staged = StagedUpload(
+                path=item["path"],
+                size=item["size"],
+                sha256=item["sha256"],
+                filename=None,
+                content_type="image/webp",
+            )
+            url = await backend.put_stream(variant_key(key, item["width"]), staged, "image/webp")
+            variants.append({"width": item["width"], "height": item["height"], "url": url})
+    except Exception as e:
+        # The original is stored; the photo just goes without variants
+        print(f"Could not store photo variants of {key}: {e}")
+        metrics.inc("photo_variant_failures_total")
+        await delete_urls(variant_urls(variants))
+        return None
+    finally:
+        await _discard_rendered(rendered)
+    return variants
+
+async def store_photo(key: str, staged: StagedUpload, content_type: Optional[str]) -> Tuple[str, Optional[List[dict]]]:
+    """Store an uploaded photo and its WebP variants; returns (url, variants)
+
+    Variants go to the backend that ended up holding the original, so they
+    always sit next to it even after a fallback to local disk. variants is
+    None when they could not be made now; the backfill retries those.
+    """
+    # Render first: putting the original may move the staged file away
+    rendered = await render_variants(staged.path)
+    try:
+        url = await storage.put_stream(key, staged, content_type)
+        located = locate(url)
+    except BaseException:
+        await _discard_rendered(rendered)
+        raise
+    if located is None:
+        await _discard_rendered(rendered)
+        return url, None
+    backend, stored_key = located
+    return url, await store_variants(backend, stored_key, rendered)
+
+async def _discard_rendered(rendered: Optional[List[dict]]):
+    for item in rendered or []:
+        await discard_staged_path(item["path"])
+
+async def variants_for_stored(url: str) -> Optional[List[dict]]:
+    """Make variants for an already stored photo (backfill)
+
+    Returns None when the photo is not in any known backend or could not
+    be read, so it is tried again on the next run.
+    """
+    located = locate(url)
+    if located is None:
+        return None
+    backend, key = located
+    if isinstance(backend, LocalStorage):
+        source = backend.path_for(key)
+        if not os.path.isfile(source):
+            return None
+        return await store_variants(backend, key, await render_variants(source))
+
+    await aiofiles.os.makedirs(INCOMING_DIR, exist_ok=True)
+    source = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.part")
+    try:
+        await backend.fetch(key, source)
+        rendered = await render_variants(source)
+    except Exception as e:
+        print(f"Could not fetch {url}: {e}")
+        return None
+    finally:
+        await discard_staged_path(source)
+    return await store_variants(backend, key, rendered)
+
+def variant_urls(variants: Optional[List[dict]]) -> List[str]:
+    return [v["url"] for v in variants or []]
@@ -1,6 +1,8 @@
-from pywebpush import webpush, WebPushException
 import json
+from typing import Optional
+import httpx
 from app.core.config import settings
+from app.services.push_transport import PushTransport, VapidHeaderCache
 
 # VAPID keys should be generated once and stored in environment variables
 # You can generate them using: 
@@ -14,31 +16,70 @@ VAPID_CLAIMS = {
     "sub": "mailto:your-email@example.com"
 }
 
-def send_push_notification(subscription_info: str, title: str, body: str, icon: str = "/icon-192x192.png"):
+_transport: Optional[PushTransport] = None
+
+def get_push_transport() -> PushTransport:
+    """Process-wide transport, so VAPID headers and connections are reused"""
+    global _transport
+    if _transport is None:
+        _transport = PushTransport(
+            VapidHeaderCache(VAPID_PRIVATE_KEY, VAPID_CLAIMS),
+            timeout=settings.PUSH_TIMEOUT_SECONDS,
+            max_connections=settings.PUSH_MAX_CONNECTIONS_PER_ORIGIN,
+        )
+    return _transport
+
+async def close_push_transport():
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
+
+class PushDeliveryError(Exception):
+    """Push could not be delivered; `retryable` tells whether trying again can help"""
+
+    def __init__(self, message: str, status_code: int = None, retryable: bool = True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+async def deliver_push(subscription_info: str, title: str, body: str, icon: str = "/icon-192x192.png"):
+    """Send one push; raises PushDeliveryError on failure"""
     if not VAPID_PRIVATE_KEY or not VAPID_PUBLIC_KEY:
-        print("VAPID keys not configured")
-        return False
+        raise PushDeliveryError("VAPID keys not configured", retryable=False)
     
     try:
         subscription = json.loads(subscription_info)
-        
-        payload = json.dumps({
-            "title": title,
-            "body": body,
-            "icon": icon,
-            "badge": "/icon-192x192.png"
-        })
-        
-        webpush(
-            subscription_info=subscription,
-            data=payload,
-            vapid_private_key=VAPID_PRIVATE_KEY,
-            vapid_claims=VAPID_CLAIMS
+    except (TypeError, ValueError) as ex:
+        raise PushDeliveryError(f"Invalid subscription: {ex}", retryable=False)
+    
+    payload = json.dumps({
+        "title": title,
+        "body": body,
+        "icon": icon,
+        "badge": "/icon-192x192.png"
+    })
+    
+    try:
+        response = await get_push_transport().send(subscription, payload)
+    except httpx.HTTPError as ex:
+        raise PushDeliveryError(f"Push request failed: {ex!r}")
+    except Exception as ex:
+        raise PushDeliveryError(str(ex), retryable=False)
+    
+    if response.status_code > 202:
+        # Client errors won't fix themselves, except rate limiting
+        retryable = response.status_code >= 500 or response.status_code == 429
+        raise PushDeliveryError(
+            f"Push failed: {response.status_code} {response.text[:200]}",
+            status_code=response.status_code,
+            retryable=retryable
         )
+
+async def send_push_notification(subscription_info: str, title: str, body: str, icon: str = "/icon-192x192.png"):
+    try:
+        await deliver_push(subscription_info, title, body, icon)
         return True
-    except WebPushException as ex:
+    except PushDeliveryError as ex:
         print(f"Push notification failed: {ex}")
         return False
-    except Exception as ex:
-        print(f"Error sending push notification: {ex}")
-        return False
\ No newline at end of file
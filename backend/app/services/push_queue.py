@@ -0,0 +1,211 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from sqlalchemy import select, update, delete
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.push_subscription import PushSubscription
+from app.services.push_notification import deliver_push, PushDeliveryError
+
+# The push service says the subscription no longer exists
+GONE_STATUS_CODES = (404, 410)
+
+@dataclass
+class PushJob:
+    subscription_info: Optional[str]
+    title: str
+    body: str
+    subscription_id: Optional[int] = None
+    # Set instead of subscription_info to fan out to all of a user's devices
+    user_id: Optional[int] = None
+    attempts: int = 0
+
+class PushDispatcher:
+    """In-process queue that sends web pushes outside the request.
+
+    Requests enqueue and return immediately; a fixed pool of workers
+    delivers with exponential backoff between retries. Devices whose push
+    service answers 404/410 are deleted; successful sends are recorded in
+    batches so a busy queue does not write once per push.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_retries: int, backoff: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue: asyncio.Queue = None
+        self._tasks: List[asyncio.Task] = []
+        self._delivered: Set[int] = set()
+        # Jobs waiting out their backoff before going back on the queue
+        self._retries: Dict[asyncio.TimerHandle, PushJob] = {}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def stop(self, timeout: float = 5.0):
+        """Give queued pushes a moment to go out, then stop the workers"""
+        if not self._tasks:
+            return
+        # Retries still backing off get their last attempt now
+        retries = list(self._retries.values())
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for job in retries:
+            self._requeue(job)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Dropping {self._queue.qsize()} queued push notifications on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._retries:
+            # Scheduled by sends that failed again while draining
+            print(f"Dropping {len(self._retries)} push retries on shutdown")
+            metrics.inc("push_retries_dropped_total", len(self._retries))
+            for handle in self._retries:
+                handle.cancel()
+            self._retries.clear()
+        await self._flush_delivered()
+
+    def enqueue(self, user_id: int, title: str, body: str) -> bool:
+        """Queue a push to every device of a user without waiting for it;
+        False if it had to be dropped
+        """
+        return self._put(PushJob(None, title, body, user_id=user_id))
+
+    async def submit_user(self, user_id: int, title: str, body: str):
+        """Queue a push to every device of a user, waiting for room if the queue is full"""
+        if self._queue is None:
+            print("Push dispatcher not started, dropping notification")
+            metrics.inc("push_dropped_total")
+            return
+        await self._queue.put(PushJob(None, title, body, user_id=user_id))
+        metrics.set_gauge("push_queue_depth", self._queue.qsize())
+
+    async def submit(self, subscription_id: int, subscription_info: str, title: str, body: str):
+        """Queue a push to one device, waiting for room if the queue is full (bulk senders)"""
+        if self._queue is None:
+            print("Push dispatcher not started, dropping notification")
+            metrics.inc("push_dropped_total")
+            return
+        await self._queue.put(PushJob(subscription_info, title, body, subscription_id=subscription_id))
+        metrics.set_gauge("push_queue_depth", self._queue.qsize())
+
+    def _put(self, job: PushJob) -> bool:
+        if self._queue is None:
+            print("Push dispatcher not started, dropping notification")
+            metrics.inc("push_dropped_total")
+            return False
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            metrics.inc("push_dropped_total")
+            return False
+        metrics.set_gauge("push_queue_depth", self._queue.qsize())
+        return True
+
+    def _schedule_retry(self, job: PushJob, delay: float):
+        def fire():
+            del self._retries[handle]
+            self._requeue(job)
+
+        handle = asyncio.get_running_loop().call_later(delay, fire)
+        self._retries[handle] = job
+
+    def _requeue(self, job: PushJob):
+        if not self._put(job):
+            metrics.inc("push_retries_dropped_total")
+            print(f"Push queue full, dropping a retry after {job.attempts} attempt(s)")
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.subscription_info is None:
+                    await self._fan_out(job)
+                else:
+                    await self._send(job)
+            except Exception as e:
+                print(f"Push worker error: {e}")
+            finally:
+                self._queue.task_done()
+                metrics.set_gauge("push_queue_depth", self._queue.qsize())
+
+    async def _fan_out(self, job: PushJob):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(PushSubscription.id, PushSubscription.subscription_info)
+                .where(PushSubscription.user_id == job.user_id)
+            )
+            devices = result.all()
+        for subscription_id, subscription_info in devices:
+            self._put(PushJob(subscription_info, job.title, job.body, subscription_id=subscription_id))
+
+    async def _send(self, job: PushJob):
+        job.attempts += 1
+        started = time.monotonic()
+        try:
+            await deliver_push(job.subscription_info, job.title, job.body)
+        except PushDeliveryError as ex:
+            metrics.observe("push_send_seconds", time.monotonic() - started)
+            if ex.status_code in GONE_STATUS_CODES and job.subscription_id is not None:
+                await self._prune(job.subscription_id)
+            elif ex.retryable and job.attempts <= self.max_retries:
+                metrics.inc("push_retries_total")
+                delay = self.backoff * 2 ** (job.attempts - 1)
+                self._schedule_retry(job, delay)
+            else:
+                metrics.inc("push_failed_total")
+                print(f"Push notification failed after {job.attempts} attempt(s): {ex}")
+            return
+        metrics.observe("push_send_seconds", time.monotonic() - started)
+        metrics.inc("push_sent_total")
+        if job.subscription_id is not None:
+            self._delivered.add(job.subscription_id)
+
+    async def _prune(self, subscription_id: int):
+        self._delivered.discard(subscription_id)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(PushSubscription).where(PushSubscription.id == subscription_id))
+            await db.commit()
+        metrics.inc("push_subscriptions_pruned_total")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.PUSH_SUCCESS_FLUSH_SECONDS)
+            try:
+                await self._flush_delivered()
+            except Exception as e:
+                print(f"Failed to record push deliveries: {e}")
+
+    async def _flush_delivered(self):
+        """Stamp last_success_at for every device delivered to since the last flush"""
+        if not self._delivered:
+            return
+        ids, self._delivered = list(self._delivered), set()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(PushSubscription)
+                .where(PushSubscription.id.in_(ids))
+                .values(last_success_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+push_dispatcher = PushDispatcher(
+    workers=settings.PUSH_WORKERS,
+    max_queue=settings.PUSH_QUEUE_SIZE,
+    max_retries=settings.PUSH_MAX_RETRIES,
+    backoff=settings.PUSH_RETRY_BACKOFF_SECONDS,
+)
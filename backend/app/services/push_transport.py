@@ -0,0 +1,89 @@
+import importlib.util
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+import httpx
+from py_vapid import Vapid
+from pywebpush import WebPusher
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import metrics
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+def _origin(endpoint: str) -> str:
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+def _encrypt(subscription: dict, data: str) -> bytes:
+    """Encrypted push body (ECDH + AES-GCM; blocking)"""
+    return WebPusher(subscription).encode(data, "aes128gcm")["body"]
+
+class VapidHeaderCache:
+    """Signs VAPID JWTs once per push-service audience and reuses them.
+
+    The private key is parsed on first use only; a signed header is reused
+    until `refresh_margin` seconds before its `exp` claim.
+    """
+
+    def __init__(self, private_key: str, claims: dict, lifetime: int = 12 * 60 * 60, refresh_margin: int = 10 * 60):
+        self.private_key = private_key
+        self.claims = claims
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self._vapid: Optional[Vapid] = None
+        self._headers: Dict[str, Tuple[dict, int]] = {}
+
+    def headers_for(self, endpoint: str) -> dict:
+        audience = _origin(endpoint)
+        now = int(time.time())
+        cached = self._headers.get(audience)
+        if cached and cached[1] - self.refresh_margin > now:
+            return cached[0]
+
+        if self._vapid is None:
+            self._vapid = Vapid.from_string(private_key=self.private_key)
+        expires_at = now + self.lifetime
+        headers = self._vapid.sign({**self.claims, "aud": audience, "exp": expires_at})
+        self._headers[audience] = (headers, expires_at)
+        metrics.inc("vapid_signatures_total")
+        return headers
+
+class PushTransport:
+    """Keeps one pooled httpx client (HTTP/2 where available) per push-service origin"""
+
+    def __init__(self, vapid: VapidHeaderCache, timeout: float, max_connections: int):
+        self.vapid = vapid
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _client_for(self, origin: str) -> httpx.AsyncClient:
+        client = self._clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._clients[origin] = client
+        return client
+
+    async def send(self, subscription: dict, data: str, ttl: int = 0) -> httpx.Response:
+        endpoint = subscription["endpoint"]
+        body = await run_blocking(_encrypt, subscription, data)
+        headers = {
+            "content-encoding": "aes128gcm",
+            "ttl": str(ttl),
+            **self.vapid.headers_for(endpoint),
+        }
+        return await self._client_for(_origin(endpoint)).post(endpoint, content=body, headers=headers)
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
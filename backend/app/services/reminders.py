@@ -0,0 +1,299 @@
+import time as clock
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import select, exists, extract, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+from app.core.diary_date import logical_diary_date
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal, async_engine
+from app.models.diary import Diary
+from app.models.user import User
+from app.models.push_subscription import PushSubscription
+from app.models.scheduler_state import SchedulerState
+from app.services.push_queue import push_dispatcher
+from app.services.sync import prune_tombstones
+
+# Arbitrary application-wide key for pg_try_advisory_lock
+REMINDER_LOCK_ID = 727001
+
+class LeaderElection:
+    """Only the worker holding a Postgres advisory lock runs scheduled jobs.
+
+    The lock lives on a dedicated connection, so it is released as soon as
+    the leading worker dies and another worker picks it up on its next try.
+    Non-Postgres databases (local SQLite) always elect the local process.
+    """
+
+    def __init__(self, lock_id: int):
+        self.lock_id = lock_id
+        self._conn: Optional[AsyncConnection] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None or async_engine.dialect.name != "postgresql"
+
+    async def acquire(self) -> bool:
+        if async_engine.dialect.name != "postgresql":
+            return True
+        if self._conn is not None:
+            try:
+                await self._conn.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                print(f"Lost scheduler leadership: {e}")
+                await self.release()
+
+        conn = await async_engine.connect()
+        try:
+            # Session-level lock; autocommit so the connection is not left idle in a transaction
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id})
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self._conn = conn
+        print("Acquired scheduler leadership")
+        return True
+
+    async def release(self):
+        if self._conn is None:
+            return
+        try:
+            await self._conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id})
+        except Exception:
+            pass
+        try:
+            await self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+leader = LeaderElection(REMINDER_LOCK_ID)
+
+# scheduler_state row holding the first minute the next reminder tick has
+# to cover. Advanced only when a tick completes, so minutes skipped while a
+# slow tick held the job (max_instances=1, coalesce) are caught up by the
+# following one, and a new leader carries on where the previous one stopped.
+REMINDER_JOB = "daily_reminders"
+
+async def _load_due_from(zone: ZoneInfo) -> Optional[datetime]:
+    async with AsyncSessionLocal() as db:
+        state = await db.get(SchedulerState, REMINDER_JOB)
+        if state is None:
+            return None
+        return state.due_from.replace(tzinfo=timezone.utc).astimezone(zone)
+
+async def _save_due_from(due_from: datetime):
+    async with AsyncSessionLocal() as db:
+        await db.merge(SchedulerState(
+            job=REMINDER_JOB,
+            due_from=due_from.astimezone(timezone.utc).replace(tzinfo=None),
+        ))
+        await db.commit()
+
+async def send_due_reminders(now: Optional[datetime] = None, since: Optional[datetime] = None) -> int:
+    """Push a reminder to everyone whose reminder falls between the minute of
+    since (default: the current minute) and the current minute, and who has
+    not written today's diary yet, on every registered device.
+    Returns the number of pushes queued.
+    """
+    zone = ZoneInfo(settings.REMINDER_TIMEZONE)
+    now = now or datetime.now(zone)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=zone)
+    since = since or now
+    window_start = time(since.hour, since.minute)
+    window_end = time(now.hour, now.minute, 59, 999999)
+    if window_start <= window_end:
+        in_window = (User.reminder_time >= window_start) & (User.reminder_time <= window_end)
+    else:
+        # The window crosses midnight
+        in_window = (User.reminder_time >= window_start) | (User.reminder_time <= window_end)
+    # The diary day of the same instant the window was taken from. Diary
+    # days are cut in UTC (see logical_diary_date), so that is the date a
+    # diary written right now gets, whatever REMINDER_TIMEZONE is.
+    today = logical_diary_date(now.astimezone(timezone.utc).replace(tzinfo=None))
+
+    wrote_today = exists().where(
+        Diary.author_id == User.id,
+        Diary.diary_date == today
+    )
+    has_device = exists().where(PushSubscription.user_id == User.id)
+
+    queued = 0
+    last = None
+    async with AsyncSessionLocal() as db:
+        while True:
+            # Driven by ix_users_reminder_time: a range scan over the window,
+            # paged on (reminder_time, id), with anti-joins on
+            # (author_id, diary_date) and the user's devices
+            query = (
+                select(User.reminder_time, User.id)
+                .where(in_window, ~wrote_today, has_device)
+                .order_by(User.reminder_time, User.id)
+                .limit(settings.REMINDER_BATCH_SIZE)
+            )
+            if last is not None:
+                query = query.where(tuple_(User.reminder_time, User.id) > tuple_(*last))
+            users = (await db.execute(query)).all()
+            if not users:
+                break
+            result = await db.execute(
+                select(PushSubscription.id, PushSubscription.subscription_info)
+                .where(PushSubscription.user_id.in_([user_id for _, user_id in users]))
+                .order_by(PushSubscription.id)
+            )
+            for subscription_id, subscription_info in result.all():
+                # Waits for room in the queue instead of dropping reminders
+                await push_dispatcher.submit(
+                    subscription_id,
+                    subscription_info,
+                    "오늘의 일기를 잊지 마세요!",
+                    "오늘 하루는 어땠나요? 일기를 작성해 보세요."
+                )
+                queued += 1
+            last = tuple(users[-1])
+            if len(users) < settings.REMINDER_BATCH_SIZE:
+                break
+    return queued
+
+async def send_memory_notifications(today: Optional[date] = None) -> int:
+    """Tell everyone whose couple wrote a diary on this calendar day in a
+    previous year. Returns the number of users queued.
+    """
+    today = today or logical_diary_date()
+    # Served by ix_diaries_month_day_author_id without touching other days
+    authors = (
+        select(Diary.author_id)
+        .where(
+            extract("month", Diary.diary_date) == today.month,
+            extract("day", Diary.diary_date) == today.day,
+            Diary.diary_date < date(today.year, 1, 1)
+        )
+        .distinct()
+    )
+
+    queued = 0
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            result = await db.execute(
+                select(User.id)
+                .where(
+                    User.id.in_(authors) | User.partner_id.in_(authors),
+                    User.id > last_id
+                )
+                .order_by(User.id)
+                .limit(settings.REMINDER_BATCH_SIZE)
+            )
+            user_ids = result.scalars().all()
+            for user_id in user_ids:
+                await push_dispatcher.submit_user(
+                    user_id,
+                    "추억 속 오늘",
+                    "지난 해 오늘 작성한 일기를 다시 읽어 보세요."
+                )
+            queued += len(user_ids)
+            if len(user_ids) < settings.REMINDER_BATCH_SIZE:
+                break
+            last_id = user_ids[-1]
+    return queued
+
+async def _memories_tick():
+    if not await leader.acquire():
+        return
+    try:
+        queued = await send_memory_notifications()
+    except Exception as e:
+        metrics.inc("memories_tick_errors_total")
+        print(f"Memories push failed: {e}")
+        return
+    metrics.inc("memories_queued_total", queued)
+
+async def _prune_tick():
+    if not await leader.acquire():
+        return
+    try:
+        pruned = await prune_tombstones()
+    except Exception as e:
+        print(f"Tombstone pruning failed: {e}")
+        return
+    metrics.inc("sync_tombstones_pruned_total", pruned)
+
+async def _reminder_tick():
+    if not await leader.acquire():
+        return
+    started = clock.monotonic()
+    zone = ZoneInfo(settings.REMINDER_TIMEZONE)
+    now = datetime.now(zone)
+    current_minute = now.replace(second=0, microsecond=0)
+    try:
+        due_from = await _load_due_from(zone)
+        if due_from is not None and due_from > current_minute:
+            # This minute was covered already, e.g. by the previous leader
+            return
+        since = current_minute
+        if due_from is not None:
+            # Catch up on minutes missed since the last completed tick, but not
+            # on a backlog older than REMINDER_CATCHUP_MINUTES
+            earliest = current_minute - timedelta(minutes=settings.REMINDER_CATCHUP_MINUTES)
+            since = min(max(due_from, earliest), current_minute)
+        if since < current_minute:
+            metrics.inc("reminder_minutes_caught_up_total", int((current_minute - since).total_seconds() // 60))
+        queued = await send_due_reminders(now, since)
+        await _save_due_from(current_minute + timedelta(minutes=1))
+    except Exception as e:
+        metrics.inc("reminder_tick_errors_total")
+        print(f"Reminder tick failed: {e}")
+        return
+    metrics.observe("reminder_tick_seconds", clock.monotonic() - started)
+    metrics.inc("reminders_queued_total", queued)
+
+class ReminderScheduler:
+    def __init__(self):
+        self._scheduler: Optional[AsyncIOScheduler] = None
+
+    def start(self):
+        if not settings.REMINDERS_ENABLED or self._scheduler is not None:
+            return
+        self._scheduler = AsyncIOScheduler(timezone=settings.REMINDER_TIMEZONE)
+        self._scheduler.add_job(
+            _reminder_tick,
+            CronTrigger(second=0, timezone=settings.REMINDER_TIMEZONE),
+            id=REMINDER_JOB,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=30,
+        )
+        self._scheduler.add_job(
+            _memories_tick,
+            CronTrigger(hour=settings.MEMORIES_PUSH_HOUR, minute=0, timezone=settings.REMINDER_TIMEZONE),
+            id="daily_memories",
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=300,
+        )
+        self._scheduler.add_job(
+            _prune_tick,
+            CronTrigger(hour=4, minute=30, timezone=settings.REMINDER_TIMEZONE),
+            id="prune_sync_tombstones",
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=3600,
+        )
+        self._scheduler.start()
+
+    async def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+        await leader.release()
+
+reminder_scheduler = ReminderScheduler()
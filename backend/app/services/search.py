@@ -0,0 +1,128 @@
+import html
+import re
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import select, func, literal_column, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.diary import Diary as DiaryModel
+
+MAX_TERMS = 10
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+def search_terms(query: str) -> List[str]:
+    """Words of a user query; everything else (operators, quotes) is dropped"""
+    return re.findall(r"\w+", query)[:MAX_TERMS]
+
+def _escape_highlight(highlight: Optional[str]) -> Optional[str]:
+    # Diary text is user input; only the highlight markers may stay markup
+    if highlight is None:
+        return None
+    return (
+        html.escape(highlight)
+        .replace(html.escape(HIGHLIGHT_START), HIGHLIGHT_START)
+        .replace(html.escape(HIGHLIGHT_STOP), HIGHLIGHT_STOP)
+    )
+
+def _filters(author_ids: List[int], from_date: Optional[date], to_date: Optional[date]) -> list:
+    filters = [DiaryModel.author_id.in_(author_ids)]
+    if from_date:
+        filters.append(DiaryModel.diary_date >= from_date)
+    if to_date:
+        filters.append(DiaryModel.diary_date <= to_date)
+    return filters
+
+async def search_diaries(
+    db: AsyncSession,
+    author_ids: List[int],
+    query: str,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> list:
+    """Ranked matches among the given authors' diaries, best first.
+
+    Every term must match, as a prefix so Korean words still match with
+    particles attached. Rows carry id, author_id, title, diary_date,
+    created_at, rank and an HTML-escaped highlight.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if db.bind.dialect.name == "postgresql":
+        rows = await _search_postgres(db, terms, _filters(author_ids, from_date, to_date), limit, offset)
+    else:
+        rows = await _search_sqlite(db, terms, _filters(author_ids, from_date, to_date), limit, offset)
+
+    return [
+        {**row._mapping, "highlight": _escape_highlight(row.highlight)}
+        for row in rows
+    ]
+
+async def _search_postgres(db: AsyncSession, terms: List[str], filters: list, limit: int, offset: int):
+    tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+    search_vector = literal_column("diaries.search_vector")
+    rank = func.ts_rank_cd(search_vector, tsquery)
+
+    # GIN index scan and ranking first; ts_headline re-parses the text, so only
+    # run it for the rows of this page
+    page = (
+        select(
+            DiaryModel.id,
+            DiaryModel.author_id,
+            DiaryModel.title,
+            DiaryModel.content,
+            DiaryModel.diary_date,
+            DiaryModel.created_at,
+            rank.label("rank")
+        )
+        .where(search_vector.op("@@")(tsquery), *filters)
+        .order_by(rank.desc(), DiaryModel.diary_date.desc(), DiaryModel.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            page.c.id,
+            page.c.author_id,
+            page.c.title,
+            page.c.diary_date,
+            page.c.created_at,
+            page.c.rank,
+            func.ts_headline(
+                "simple",
+                page.c.content,
+                tsquery,
+                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MaxWords=20, MinWords=5"
+            ).label("highlight")
+        )
+        .order_by(page.c.rank.desc(), page.c.diary_date.desc(), page.c.id.desc())
+    )
+    return result.all()
+
+async def _search_sqlite(db: AsyncSession, terms: List[str], filters: list, limit: int, offset: int):
+    diaries_fts = table("diaries_fts", column("rowid"))
+    fts = literal_column("diaries_fts")
+    # bm25 is lower-is-better; titles weigh more than content
+    rank = -func.bm25(fts, 10.0, 1.0)
+
+    result = await db.execute(
+        select(
+            DiaryModel.id,
+            DiaryModel.author_id,
+            DiaryModel.title,
+            DiaryModel.diary_date,
+            DiaryModel.created_at,
+            rank.label("rank"),
+            func.snippet(fts, 1, HIGHLIGHT_START, HIGHLIGHT_STOP, "…", 20).label("highlight")
+        )
+        .join(diaries_fts, diaries_fts.c.rowid == DiaryModel.id)
+        .where(fts.op("MATCH")(" ".join(f'"{term}"*' for term in terms)), *filters)
+        .order_by(rank.desc(), DiaryModel.diary_date.desc(), DiaryModel.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return result.all()
@@ -0,0 +1,373 @@
+import os
+import shutil
+import threading
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import aiofiles
+import httpx
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import metrics
+from app.services.uploads import StagedUpload, UPLOADS_DIR, publish_local
+
+BUCKET = "photos"
+# Supabase deletes take a list of paths; keep each request small
+DELETE_BATCH_SIZE = 100
+
+class StorageUnavailable(Exception):
+    """Storage is not configured or its circuit breaker is open"""
+
+class StorageBackend:
+    """Where photo files live.
+
+    Keys are bucket-relative paths such as "monthly/<file>" or
+    "diaries/<couple>/<date>/<file>". The URL returned by put_stream is
+    what gets stored on DiaryPhoto/MonthlyPhoto rows; key_for_url maps it
+    back so the file can be deleted later.
+    """
+    name = "storage"
+
+    async def put_stream(self, key: str, staged: StagedUpload, content_type: Optional[str]) -> str:
+        """Store a staged upload under key and return its URL"""
+        raise NotImplementedError
+
+    async def delete_many(self, keys: List[str]):
+        raise NotImplementedError
+
+    def url_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def fetch(self, key: str, destination: str):
+        """Copy a stored file to a local path"""
+        raise NotImplementedError
+
+    def read_stream(self, key: str) -> AsyncIterator[bytes]:
+        """A stored file's bytes in chunks; FileNotFoundError if it is gone"""
+        raise NotImplementedError
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """The key behind a URL this backend handed out, or None"""
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    """Files under uploads/, served as {BASE_URL}/uploads/<key>"""
+    name = "local"
+
+    def __init__(self, root: str = UPLOADS_DIR):
+        self.root = os.path.abspath(root)
+
+    def path_for(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    async def put_stream(self, key: str, staged: StagedUpload, content_type: Optional[str]) -> str:
+        await publish_local(staged, self.path_for(key))
+        return self.url_for(key)
+
+    async def delete_many(self, keys: List[str]):
+        if keys:
+            await run_blocking(self._remove_files, [self.path_for(key) for key in keys])
+
+    @staticmethod
+    def _remove_files(paths: List[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def url_for(self, key: str) -> str:
+        return f"{settings.BASE_URL}/uploads/{key}"
+
+    async def exists(self, key: str) -> bool:
+        return await run_blocking(os.path.isfile, self.path_for(key))
+
+    async def fetch(self, key: str, destination: str):
+        await run_blocking(shutil.copyfile, self.path_for(key), destination)
+
+    async def read_stream(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path_for(key), "rb") as source:
+            while chunk := await source.read(settings.UPLOAD_CHUNK_BYTES):
+                yield chunk
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        # Also matches the relative /uploads/<file> URLs of older rows
+        path = urlparse(url).path
+        if "/uploads/" not in path:
+            return None
+        key = path.split("/uploads/", 1)[1]
+        try:
+            self.path_for(key)
+        except ValueError:
+            return None
+        return key
+
+class MemoryStorage(StorageBackend):
+    """Keeps files in a dict; for tests and offline benchmarks"""
+    name = "memory"
+
+    def __init__(self):
+        self.objects: Dict[str, bytes] = {}
+
+    async def put_stream(self, key: str, staged: StagedUpload, content_type: Optional[str]) -> str:
+        chunks = []
+        async with aiofiles.open(staged.path, "rb") as source:
+            while chunk := await source.read(settings.UPLOAD_CHUNK_BYTES):
+                chunks.append(chunk)
+        self.objects[key] = b"".join(chunks)
+        return self.url_for(key)
+
+    async def delete_many(self, keys: List[str]):
+        for key in keys:
+            self.objects.pop(key, None)
+
+    def url_for(self, key: str) -> str:
+        return f"memory://{BUCKET}/{key}"
+
+    async def exists(self, key: str) -> bool:
+        return key in self.objects
+
+    async def fetch(self, key: str, destination: str):
+        async with aiofiles.open(destination, "wb") as out:
+            await out.write(self._get(key))
+
+    async def read_stream(self, key: str) -> AsyncIterator[bytes]:
+        data = self._get(key)
+        for start in range(0, len(data), settings.UPLOAD_CHUNK_BYTES):
+            yield data[start:start + settings.UPLOAD_CHUNK_BYTES]
+
+    def _get(self, key: str) -> bytes:
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise FileNotFoundError(key) from None
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        prefix = f"memory://{BUCKET}/"
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage through one process-wide client behind a circuit breaker.
+
+    The client (and the HTTP connections of its storage session) is
+    created once and shared by every upload. While the breaker is open,
+    run() fails immediately so callers fall back to local disk without
+    waiting for another timeout.
+    """
+    name = "supabase"
+
+    def __init__(self):
+        self._client: Optional[Client] = None
+        # For streaming reads (exports); uploads go through the SDK client
+        self._http: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            "storage",
+            failure_threshold=settings.STORAGE_BREAKER_FAILURES,
+            cooldown=settings.STORAGE_BREAKER_COOLDOWN_SECONDS,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.SUPABASE_URL and settings.SUPABASE_KEY)
+
+    def _get_client(self) -> Client:
+        """Create the client on first use (blocking)"""
+        with self._lock:
+            if self._client is None:
+                self._client = create_client(
+                    settings.SUPABASE_URL,
+                    settings.SUPABASE_KEY,
+                    options=ClientOptions(storage_client_timeout=settings.STORAGE_TIMEOUT_SECONDS),
+                )
+            return self._client
+
+    async def run(self, operation, *args):
+        """Run operation(client, *args) in the thread pool, tracked by the breaker"""
+        if not self.configured:
+            raise StorageUnavailable("Supabase is not configured")
+        if not self.breaker.allow():
+            raise StorageUnavailable("Supabase circuit breaker is open")
+        try:
+            client = await run_blocking(self._get_client)
+            result = await run_blocking(operation, client, *args)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def put_stream(self, key: str, staged: StagedUpload, content_type: Optional[str]) -> str:
+        return await self.run(_supabase_upload, key, staged, content_type or "image/jpeg")
+
+    async def delete_many(self, keys: List[str]):
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            await self.run(_supabase_remove, keys[start:start + DELETE_BATCH_SIZE])
+
+    def url_for(self, key: str) -> str:
+        return f"{settings.SUPABASE_URL}/storage/v1/object/public/{BUCKET}/{key}"
+
+    async def exists(self, key: str) -> bool:
+        return await self.run(_supabase_exists, key)
+
+    async def fetch(self, key: str, destination: str):
+        await self.run(_supabase_download, key, destination)
+
+    async def read_stream(self, key: str) -> AsyncIterator[bytes]:
+        """Stream a public object over the shared async HTTP client"""
+        if not self.configured:
+            raise StorageUnavailable("Supabase is not configured")
+        if not self.breaker.allow():
+            raise StorageUnavailable("Supabase circuit breaker is open")
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=settings.STORAGE_TIMEOUT_SECONDS)
+        try:
+            async with self._http.stream("GET", self.url_for(key)) as response:
+                if response.status_code == 404:
+                    self.breaker.record_success()
+                    raise FileNotFoundError(key)
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(settings.UPLOAD_CHUNK_BYTES):
+                    yield chunk
+        except FileNotFoundError:
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        marker = f"/object/public/{BUCKET}/"
+        if not self.configured or not url.startswith(settings.SUPABASE_URL) or marker not in url:
+            return None
+        return urlparse(url).path.split(marker, 1)[1]
+
+    async def close(self):
+        http, self._http = self._http, None
+        if http is not None:
+            await http.aclose()
+        client, self._client = self._client, None
+        # Only close the storage session if it was ever opened
+        storage = getattr(client, "_storage", None)
+        if storage is not None:
+            await run_blocking(storage.aclose)
+
+def _supabase_upload(client: Client, key: str, staged: StagedUpload, content_type: str) -> str:
+    """Upload to the photos bucket and return the public URL (blocking)
+
+    The staged file is streamed from disk rather than loaded into memory.
+    """
+    with open(staged.path, "rb") as source:
+        client.storage.from_(BUCKET).upload(key, source, file_options={"content-type": content_type})
+    return client.storage.from_(BUCKET).get_public_url(key)
+
+def _supabase_remove(client: Client, keys: List[str]):
+    client.storage.from_(BUCKET).remove(keys)
+
+def _supabase_exists(client: Client, key: str) -> bool:
+    response = client.storage.session.head(f"object/public/{BUCKET}/{key}")
+    return response.status_code == 200
+
+def _supabase_download(client: Client, key: str, destination: str):
+    """Stream an object to a local file in chunks (blocking)"""
+    with client.storage.session.stream("GET", f"object/public/{BUCKET}/{key}") as response:
+        response.raise_for_status()
+        with open(destination, "wb") as out:
+            for chunk in response.iter_bytes(settings.UPLOAD_CHUNK_BYTES):
+                out.write(chunk)
+
+class FallbackStorage(StorageBackend):
+    """Writes to primary and falls back to secondary when primary fails"""
+
+    def __init__(self, primary: StorageBackend, secondary: StorageBackend):
+        self.primary = primary
+        self.secondary = secondary
+        self.name = f"{primary.name}+{secondary.name}"
+
+    async def put_stream(self, key: str, staged: StagedUpload, content_type: Optional[str]) -> str:
+        try:
+            return await self.primary.put_stream(key, staged, content_type)
+        except StorageUnavailable as e:
+            print(f"{self.primary.name} storage skipped: {e}")
+        except Exception as e:
+            print(f"{self.primary.name} storage error, using {self.secondary.name}: {e}")
+        metrics.inc("storage_fallback_total")
+        return await self.secondary.put_stream(key, staged, content_type)
+
+    async def delete_many(self, keys: List[str]):
+        # Keys alone do not say where a file ended up; use delete_urls()
+        await self.primary.delete_many(keys)
+        await self.secondary.delete_many(keys)
+
+    def url_for(self, key: str) -> str:
+        return self.primary.url_for(key)
+
+    async def exists(self, key: str) -> bool:
+        return await self._primary_has(key) or await self.secondary.exists(key)
+
+    async def fetch(self, key: str, destination: str):
+        if await self._primary_has(key):
+            await self.primary.fetch(key, destination)
+        else:
+            await self.secondary.fetch(key, destination)
+
+    async def read_stream(self, key: str) -> AsyncIterator[bytes]:
+        backend = self.primary if await self._primary_has(key) else self.secondary
+        async for chunk in backend.read_stream(key):
+            yield chunk
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        return self.primary.key_for_url(url) or self.secondary.key_for_url(url)
+
+    async def _primary_has(self, key: str) -> bool:
+        """Whether primary holds key; False when it cannot be asked, so reads go to secondary"""
+        try:
+            return await self.primary.exists(key)
+        except StorageUnavailable as e:
+            print(f"{self.primary.name} storage skipped: {e}")
+        except Exception as e:
+            print(f"{self.primary.name} storage error, using {self.secondary.name}: {e}")
+        metrics.inc("storage_fallback_total")
+        return False
+
+supabase_storage = SupabaseStorage()
+local_storage = LocalStorage()
+memory_storage = MemoryStorage()
+
+def _select_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "memory":
+        return memory_storage
+    if settings.STORAGE_BACKEND == "local" or not supabase_storage.configured:
+        return local_storage
+    return FallbackStorage(supabase_storage, local_storage)
+
+# Where new photos are written (STORAGE_BACKEND: auto, local or memory)
+storage = _select_storage()
+
+def locate(url: str) -> Optional[Tuple[StorageBackend, str]]:
+    """The backend holding a stored photo and its key there, or None"""
+    for backend in (supabase_storage, local_storage, memory_storage):
+        key = backend.key_for_url(url)
+        if key:
+            return backend, key
+    return None
+
+async def delete_urls(urls: Iterable[Optional[str]]):
+    """Delete stored photos by URL, one batch per backend; failures are logged"""
+    urls = [url for url in urls if url]
+    for backend in (supabase_storage, local_storage, memory_storage):
+        keys = [key for key in (backend.key_for_url(url) for url in urls) if key]
+        if not keys:
+            continue
+        try:
+            await backend.delete_many(keys)
+        except Exception as e:
+            print(f"Failed to delete {len(keys)} file(s) from {backend.name} storage: {e}")
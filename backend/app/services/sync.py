@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.sync_tombstone import SyncTombstone
+
+# Entity names shared by tombstones and /sync clients
+ANNIVERSARY = "anniversary"
+MONTHLY_PHOTO = "monthly_photo"
+
+def record_deletion(db: AsyncSession, entity: str, entity_id: int, user_ids: Iterable[Optional[int]]):
+    """Leave a tombstone for every user who may hold the row offline.
+
+    Added to the caller's session so it commits together with the delete.
+    """
+    for user_id in set(user_ids):
+        if user_id is not None:
+            db.add(SyncTombstone(user_id=user_id, entity=entity, entity_id=entity_id))
+
+async def prune_tombstones(now: Optional[datetime] = None) -> int:
+    """Drop tombstones no client cursor may still need; returns the number removed"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff)
+        )
+        await db.commit()
+    return result.rowcount or 0
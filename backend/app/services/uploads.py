@@ -0,0 +1,122 @@
+import asyncio
+import errno
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+from app.core.config import settings
+from app.core.executor import run_blocking
+
+UPLOADS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
+# Uploads in progress; on the same filesystem as uploads/ so they can be renamed into place
+INCOMING_DIR = os.path.join(UPLOADS_DIR, ".incoming")
+
+_upload_slots: Optional[asyncio.Semaphore] = None
+
+def upload_slots() -> asyncio.Semaphore:
+    """Worker-wide bound on concurrent photo uploads"""
+    global _upload_slots
+    if _upload_slots is None:
+        _upload_slots = asyncio.Semaphore(settings.PHOTO_UPLOAD_CONCURRENCY)
+    return _upload_slots
+
+@dataclass
+class StagedUpload:
+    """An upload copied to a temp file, with its size and digest"""
+    path: str
+    size: int
+    sha256: str
+    filename: Optional[str]
+    content_type: Optional[str]
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File is larger than {settings.MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+    )
+
+def check_upload_size(upload: UploadFile):
+    """Reject an upload whose size is already known to be over the limit"""
+    if upload.size is not None and upload.size > settings.MAX_UPLOAD_BYTES:
+        raise _too_large()
+
+async def stage_upload(upload: UploadFile) -> StagedUpload:
+    """Copy an upload to a temp file in fixed-size chunks.
+
+    Memory use is bounded by UPLOAD_CHUNK_BYTES whatever the file size.
+    Raises 413 as soon as the file grows past MAX_UPLOAD_BYTES.
+    """
+    check_upload_size(upload)
+    await aiofiles.os.makedirs(INCOMING_DIR, exist_ok=True)
+    path = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(path, "wb") as out:
+            while True:
+                chunk = await upload.read(settings.UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_BYTES:
+                    raise _too_large()
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await discard_staged_path(path)
+        raise
+    return StagedUpload(
+        path=path,
+        size=size,
+        sha256=digest.hexdigest(),
+        filename=upload.filename,
+        content_type=upload.content_type,
+    )
+
+async def publish_local(staged: StagedUpload, destination: str):
+    """Move a staged upload to its final path; readers never see a partial file"""
+    await run_blocking(_move_into_place, staged.path, destination)
+
+def _move_into_place(source: str, destination: str):
+    os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+    try:
+        os.replace(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Different filesystem: copy next to the destination, then rename
+        partial = f"{destination}.{uuid.uuid4().hex}.part"
+        shutil.copyfile(source, partial)
+        os.replace(partial, destination)
+        os.remove(source)
+
+async def discard_staged(staged: StagedUpload):
+    """Remove the temp file unless it was already published"""
+    await discard_staged_path(staged.path)
+
+async def discard_staged_path(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def cleanup_incoming(max_age_seconds: float = 3600) -> int:
+    """Delete temp files left behind by a crashed worker (blocking)"""
+    if not os.path.isdir(INCOMING_DIR):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for entry in os.scandir(INCOMING_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -0,0 +1,83 @@
+"""Make WebP variants for photos uploaded before they existed.
+
+Usage: python backfill_photo_variants.py [--batch-size 50]
+
+Walks diary_photos and monthly_photos rows whose variants are NULL in id
+order, resizes each original in the process pool and stores the copies
+next to it. Safe to stop and rerun: finished rows are skipped, and photos
+that could not be fetched stay NULL for the next run.
+"""
+import argparse
+import asyncio
+from sqlalchemy import select, update
+from app.db.database import AsyncSessionLocal, async_engine
+from app.api.deps import bump_data_version
+from app.core.config import settings
+from app.core.executor import shutdown_executor
+from app.models.diary import Diary
+from app.models.diary_photo import DiaryPhoto
+from app.models.monthly_photo import MonthlyPhoto
+from app.services.images import variants_for_stored
+
+async def backfill(model, owner_query, batch_size: int) -> int:
+    """Process every photo of one table; returns how many got variants"""
+    done = 0
+    last_id = 0
+    slots = asyncio.Semaphore(settings.IMAGE_PROCESS_WORKERS)
+
+    async def process(url):
+        async with slots:
+            return await variants_for_stored(url)
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                owner_query
+                .where(model.variants.is_(None), model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                return done
+            last_id = rows[-1].id
+            # Release the read transaction while files are being resized
+            await db.rollback()
+
+            results = await asyncio.gather(*(process(row.photo_url) for row in rows))
+            owners = set()
+            for row, variants in zip(rows, results):
+                if variants is None:
+                    continue
+                # updated_at moves too, so /sync clients pick up the new URLs
+                await db.execute(update(model).where(model.id == row.id).values(variants=variants))
+                owners.add(row.owner_id)
+                done += 1
+            # Calendar and day ETags must change for the new fields to show up
+            for owner_id in owners:
+                await bump_data_version(db, owner_id)
+            await db.commit()
+        print(f"{model.__tablename__}: up to id {last_id}, {done} done")
+
+async def main(batch_size: int):
+    try:
+        diary_photos = await backfill(
+            DiaryPhoto,
+            select(DiaryPhoto.id, DiaryPhoto.photo_url, Diary.author_id.label("owner_id"))
+            .join(Diary, Diary.id == DiaryPhoto.diary_id),
+            batch_size,
+        )
+        monthly_photos = await backfill(
+            MonthlyPhoto,
+            select(MonthlyPhoto.id, MonthlyPhoto.photo_url, MonthlyPhoto.created_by.label("owner_id")),
+            batch_size,
+        )
+        print(f"Backfill finished: {diary_photos} diary photos, {monthly_photos} monthly photos")
+    finally:
+        await async_engine.dispose()
+        shutdown_executor()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Make WebP variants for existing photos")
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
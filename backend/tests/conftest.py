@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+# Settings are read on import, so configure them before the app is loaded
+_db_dir = tempfile.mkdtemp(prefix="lovary-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["SECRET_KEY"] = "test-secret"
+os.environ["REMINDERS_ENABLED"] = "false"
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["SYNC_SETTLE_SECONDS"] = "0"
+os.environ["SYNC_PAGE_SIZE"] = "2"
+
+import pytest
+from fastapi.testclient import TestClient
+import app.models  # noqa: F401  registers every table on Base.metadata
+from app.api.deps import principal_cache
+from app.db.database import Base, SessionLocal, engine
+from app.main import app
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    principal_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        # Full-text index created by a DDL hook on diaries (see app.models.diary)
+        conn.exec_driver_sql("DROP TABLE IF EXISTS diaries_fts")
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+def login(client: TestClient, email: str, password: str = "pw") -> dict:
+    """Register a user and return Authorization headers for them"""
+    client.post("/api/auth/register", json={"email": email, "password": password, "name": email.split("@")[0]})
+    response = client.post("/api/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def couple(client):
+    """Two connected partners: (my headers, partner headers)"""
+    me = login(client, "me@example.com")
+    partner = login(client, "partner@example.com")
+    request = client.post("/api/users/partner-request", json={"recipient_email": "me@example.com"}, headers=partner)
+    assert request.status_code == 200
+    accepted = client.put(f"/api/users/partner-request/{request.json()['id']}/accept", headers=me)
+    assert accepted.status_code == 200
+    return me, partner
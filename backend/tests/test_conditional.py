@@ -0,0 +1,43 @@
+from app.core.conditional import etag_matches, make_etag
+
+def test_etag_matching():
+    etag = make_etag("/api/calendar/2024/5", "1:a")
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag[2:], etag)
+    assert etag_matches(f'W/"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"other"', etag)
+
+def test_calendar_answers_304_until_the_couple_writes(client, couple):
+    me, partner = couple
+    first = client.get("/api/calendar/2024/5", headers=me)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/api/calendar/2024/5", headers={**me, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+    created = client.post("/api/anniversary/", json={"date": "2024-05-01", "name": "first date"}, headers=partner)
+    assert created.status_code == 200
+    changed = client.get("/api/calendar/2024/5", headers={**me, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["anniversaries"]
+
+def test_etag_covers_the_query_string(client, couple):
+    me, _ = couple
+    full = client.get("/api/diary/month/2024/5", headers=me)
+    compact = client.get("/api/diary/month/2024/5", params={"compact": "true"}, headers=me)
+    assert full.headers["etag"] != compact.headers["etag"]
+    stale = client.get("/api/diary/month/2024/5", params={"compact": "true"}, headers={**me, "If-None-Match": full.headers["etag"]})
+    assert stale.status_code == 200
+
+def test_etag_is_per_user(client, couple):
+    me, partner = couple
+    mine = client.get("/api/calendar/2024/5", headers=me).headers["etag"]
+    theirs = client.get("/api/calendar/2024/5", headers={**partner, "If-None-Match": mine})
+    assert theirs.status_code == 200
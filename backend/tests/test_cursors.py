@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.api.diary import _decode_cursor, _encode_cursor
+from app.api.sync import CURSOR_VERSION, SyncCursor
+from app.models.diary import Diary
+from tests.conftest import login
+
+def test_diary_cursor_round_trip():
+    row = SimpleNamespace(created_at=datetime(2024, 5, 1, 12, 30, 15, 250000), id=42)
+    assert _decode_cursor(_encode_cursor(row)) == (row.created_at, 42)
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "Zm9v", "MjAyNC0wNS0wMXw="])
+def test_diary_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_sync_cursor_round_trip():
+    cursor = SyncCursor(
+        issued_at=datetime(2024, 5, 1, 12, 0),
+        partner_id=7,
+        positions={"diaries": (datetime(2024, 5, 1, 11, 0), 3), "deleted": (datetime(2024, 4, 1), 0)},
+    )
+    decoded = SyncCursor.decode(cursor.encode())
+    assert decoded.issued_at == cursor.issued_at
+    assert decoded.partner_id == 7
+    assert decoded.positions == cursor.positions
+
+def test_sync_cursor_rejects_other_versions():
+    raw = json.dumps({"v": CURSOR_VERSION + 1, "t": "2024-05-01T00:00:00", "p": None, "k": {}})
+    with pytest.raises(HTTPException) as error:
+        SyncCursor.decode(base64.urlsafe_b64encode(raw.encode()).decode())
+    assert error.value.status_code == 400
+
+def test_my_diaries_pages_without_gaps_or_repeats(client, db):
+    headers = login(client, "me@example.com")
+    created_at = datetime(2024, 1, 1, 12, 0)
+    # Equal created_at values are what the id tie-breaker is for
+    db.add_all([
+        Diary(author_id=1, title=f"t{i}", content="c", diary_date=date(2024, 1, 1) + timedelta(days=i),
+              created_at=created_at if i % 2 else created_at + timedelta(hours=i))
+        for i in range(7)
+    ])
+    db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/diary/my", params=params, headers=headers).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == list(range(1, 8))
+    assert len(seen) == len(set(seen))
@@ -0,0 +1,65 @@
+import io
+import json
+import zipfile
+from datetime import date, timedelta
+from app.models.diary import Diary
+from tests.conftest import login
+
+def _ndjson(*entries) -> bytes:
+    return "\n".join(e if isinstance(e, str) else json.dumps(e) for e in entries).encode()
+
+def _upload(client, headers, data: bytes, name: str = "diaries.ndjson"):
+    return client.post("/api/import", files={"file": (name, data, "application/octet-stream")}, headers=headers)
+
+def test_import_skips_days_that_already_have_a_diary(client, db):
+    headers = login(client, "me@example.com")
+    db.add(Diary(author_id=1, title="kept", content="c", diary_date=date(2024, 1, 2)))
+    db.commit()
+    data = _ndjson(
+        {"title": "a", "content": "c", "diary_date": "2024-01-01"},
+        {"title": "replaced?", "content": "c", "diary_date": "2024-01-02"},
+        {"title": "b", "content": "c", "diary_date": "2024-01-03"},
+    )
+
+    result = _upload(client, headers, data).json()
+    assert (result["processed"], result["inserted"], result["skipped"], result["rejected"]) == (3, 2, 1, 0)
+    assert db.query(Diary).filter_by(diary_date=date(2024, 1, 2)).one().title == "kept"
+
+    # Importing the same file again goes entirely through ON CONFLICT DO NOTHING
+    again = _upload(client, headers, data).json()
+    assert (again["inserted"], again["skipped"]) == (0, 3)
+    assert db.query(Diary).count() == 3
+
+def test_import_counts_every_line_once(client):
+    headers = login(client, "me@example.com")
+    data = _ndjson(
+        {"title": "a", "content": "c", "diary_date": "2024-01-01"},
+        "{not json",
+        {"title": "no date", "content": "c"},
+        {"title": "today", "content": "c", "diary_date": str(date.today() + timedelta(days=1))},
+        "",
+    )
+    result = _upload(client, headers, data).json()
+    assert result["processed"] == 4
+    assert result["inserted"] + result["skipped"] + result["rejected"] == result["processed"]
+    assert result["rejected"] == 3
+    assert len(result["errors"]) == 3
+
+def test_import_takes_only_my_entries_from_a_couple_export(client, couple, db):
+    me, partner = couple
+    lines = _ndjson(
+        {"title": "mine", "content": "c", "diary_date": "2024-01-01", "author_id": 1},
+        {"title": "theirs", "content": "c", "diary_date": "2024-01-01", "author_id": 2},
+    )
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("diaries.ndjson", lines)
+        z.writestr("manifest.json", json.dumps({"user_id": 2, "partner_id": 1}))
+
+    result = _upload(client, me, archive.getvalue(), "export.zip").json()
+    assert result["inserted"] == 1
+    assert [d.title for d in db.query(Diary).filter_by(author_id=1)] == ["mine"]
+
+    stranger = login(client, "stranger@example.com")
+    refused = _upload(client, stranger, archive.getvalue(), "export.zip")
+    assert refused.status_code == 403
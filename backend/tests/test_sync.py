@@ -0,0 +1,48 @@
+def _sync_all(client, headers, cursor=None):
+    """Follow has_more to the end; returns (pages, final cursor)"""
+    pages = []
+    while True:
+        params = {"since": cursor} if cursor else {}
+        response = client.get("/api/sync", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            return pages, cursor
+
+def test_sync_pages_through_a_full_snapshot(client, couple):
+    me, partner = couple
+    for day in range(1, 6):
+        client.post("/api/anniversary/", json={"date": f"2024-05-0{day}", "name": f"day {day}"}, headers=partner)
+
+    pages, _ = _sync_all(client, me)
+    assert len(pages) == 3  # SYNC_PAGE_SIZE is 2 in tests
+    assert pages[0]["reset"] and not pages[1]["reset"]
+    ids = [a["id"] for page in pages for a in page["anniversaries"]]
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+
+def test_sync_reports_deletions_to_both_partners(client, couple):
+    me, partner = couple
+    for day in range(1, 4):
+        client.post("/api/anniversary/", json={"date": f"2024-05-0{day}", "name": f"day {day}"}, headers=me)
+    _, my_cursor = _sync_all(client, me)
+    _, partner_cursor = _sync_all(client, partner)
+
+    assert client.delete("/api/anniversary/2", headers=me).status_code == 200
+
+    for headers, cursor in ((me, my_cursor), (partner, partner_cursor)):
+        pages, cursor = _sync_all(client, headers, cursor)
+        deleted = [d for page in pages for d in page["deleted"]]
+        assert [(d["entity"], d["id"]) for d in deleted] == [("anniversary", 2)]
+        assert not any(page["anniversaries"] for page in pages)
+        # Nothing is repeated once the change has been seen
+        pages, _ = _sync_all(client, headers, cursor)
+        assert not pages[0]["deleted"] and not pages[0]["anniversaries"]
+
+def test_sync_resets_when_the_partner_changes(client, couple):
+    me, _ = couple
+    _, cursor = _sync_all(client, me)
+    assert client.delete("/api/users/partner/disconnect", headers=me).status_code == 200
+    page = client.get("/api/sync", params={"since": cursor}, headers=me).json()
+    assert page["reset"]
@@ -6,6 +6,9 @@ export interface DiaryPhoto {
   photo_url: string
   original_filename?: string
   created_at: string
+  // Resized WebP copies; null until the server has made them
+  thumbnail_url?: string | null
+  srcset?: string | null
 }
 
 export interface DiaryCreate {
@@ -19,11 +22,49 @@ export interface Diary {
   title: string
   content: string
   author_id: number
+  diary_date: string
   created_at: string
   is_read_by_partner: boolean
   photos?: DiaryPhoto[]
 }
 
+export interface DiarySummary {
+  id: number
+  title: string
+  diary_date: string
+  created_at: string
+  photo_count: number
+  first_photo_url?: string | null
+  first_photo_thumbnail_url?: string | null
+}
+
+export interface DiaryPage<T> {
+  items: T[]
+  next_cursor: string | null
+}
+
+export interface DiaryMemories {
+  month: number
+  day: number
+  years: { year: number; my_diary: Diary | null; partner_diary: Diary | null }[]
+}
+
+export interface DiarySearchResult {
+  id: number
+  author_id: number
+  title: string
+  diary_date: string
+  created_at: string
+  rank: number
+  // HTML-escaped excerpt; matches are wrapped in <mark>
+  highlight: string | null
+}
+
+export interface DiarySearchPage {
+  items: DiarySearchResult[]
+  next_offset: number | null
+}
+
 export const diaryApi = {
   async createDiary(data: DiaryCreate): Promise<Diary> {
     console.log('diaryApi.createDiary called with:', data)
@@ -59,8 +100,23 @@ export const diaryApi = {
     return response.data
   },
 
-  async getMyDiaries(): Promise<Diary[]> {
-    const response = await apiClient.get<Diary[]>('/api/diary/my')
+  async getMyDiaries(params: { cursor?: string; limit?: number; view?: 'summary' | 'full' } = {}): Promise<DiaryPage<DiarySummary | Diary>> {
+    const response = await apiClient.get<DiaryPage<DiarySummary | Diary>>('/api/diary/my', { params })
+    return response.data
+  },
+
+  async getMemories(month: number, day: number): Promise<DiaryMemories> {
+    const response = await apiClient.get<DiaryMemories>(`/api/diary/memories/${month}/${day}`)
+    return response.data
+  },
+
+  async searchDiaries(params: { q: string; from_date?: string; to_date?: string; limit?: number; offset?: number }): Promise<DiarySearchPage> {
+    const response = await apiClient.get<DiarySearchPage>('/api/diary/search', { params })
+    return response.data
+  },
+
+  async getDiary(diaryId: number): Promise<Diary> {
+    const response = await apiClient.get<Diary>(`/api/diary/${diaryId}`)
     return response.data
   },
 
@@ -0,0 +1,90 @@
+import { apiClient } from './client'
+
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
+const RECONNECT_DELAY_MS = 5000
+
+export type PartnerEventType =
+  | 'diary.created'
+  | 'diary.updated'
+  | 'diary.read'
+  | 'photo.updated'
+  | 'anniversary.updated'
+  | 'anniversary.deleted'
+  | 'partner.requested'
+  | 'partner.rejected'
+  | 'partner.connected'
+  | 'partner.disconnected'
+  | 'partner.updated'
+  | 'diary.imported'
+  | 'import.progress'
+
+export const PARTNER_EVENT_TYPES: PartnerEventType[] = [
+  'diary.created',
+  'diary.updated',
+  'diary.read',
+  'photo.updated',
+  'anniversary.updated',
+  'anniversary.deleted',
+  'partner.requested',
+  'partner.rejected',
+  'partner.connected',
+  'partner.disconnected',
+  'partner.updated',
+  'diary.imported',
+  'import.progress'
+]
+
+// Server-sent events replace polling. The stream is opened with a
+// short-lived token from POST /api/events/token so the login token never
+// ends up in a URL. EventSource reconnects on its own while that token is
+// still valid; once the server refuses it, a fresh one is fetched.
+// Returns a function that closes the stream.
+export function subscribeToEvents(onEvent: (type: PartnerEventType, data: any) => void): () => void {
+  if (!localStorage.getItem('token')) {
+    return () => {}
+  }
+
+  let source: EventSource | null = null
+  let retryTimer: ReturnType<typeof setTimeout> | undefined
+  let closed = false
+
+  const reconnectLater = () => {
+    if (!closed) {
+      retryTimer = setTimeout(connect, RECONNECT_DELAY_MS)
+    }
+  }
+
+  async function connect() {
+    let token: string
+    try {
+      const response = await apiClient.post<{ token: string }>('/api/events/token')
+      token = response.data.token
+    } catch (error) {
+      console.error('Failed to get an events token:', error)
+      reconnectLater()
+      return
+    }
+    if (closed) return
+
+    source = new EventSource(`${API_URL}/api/events?token=${encodeURIComponent(token)}`)
+    for (const type of PARTNER_EVENT_TYPES) {
+      source.addEventListener(type, (event) => {
+        onEvent(type, JSON.parse((event as MessageEvent).data))
+      })
+    }
+    source.onerror = () => {
+      // CLOSED means the browser gave up, e.g. after a 401 for an expired token
+      if (source?.readyState === EventSource.CLOSED) {
+        source = null
+        reconnectLater()
+      }
+    }
+  }
+
+  connect()
+  return () => {
+    closed = true
+    clearTimeout(retryTimer)
+    source?.close()
+  }
+}
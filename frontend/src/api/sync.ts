@@ -0,0 +1,46 @@
+import { apiClient } from './client'
+import type { Anniversary } from './anniversary'
+import type { Diary, DiaryPhoto } from './diary'
+import type { User } from './users'
+
+export interface SyncMonthlyPhoto {
+  id: number
+  year: number
+  month: number
+  couple_id: string
+  photo_url: string
+  thumbnail_url: string | null
+  srcset: string | null
+  created_at: string
+  updated_at: string
+  created_by: number
+}
+
+export interface SyncDeletion {
+  entity: 'anniversary' | 'monthly_photo'
+  id: number
+  deleted_at: string
+}
+
+export interface SyncChanges {
+  cursor: string
+  has_more: boolean
+  // Drop everything stored locally before applying this change set
+  reset: boolean
+  user: User
+  diaries: (Omit<Diary, 'photos'> & { updated_at: string })[]
+  diary_photos: (DiaryPhoto & { updated_at: string })[]
+  monthly_photos: SyncMonthlyPhoto[]
+  anniversaries: (Anniversary & { updated_at: string })[]
+  deleted: SyncDeletion[]
+}
+
+export const syncApi = {
+  // Apply `deleted` first, then the upserts; keep calling while has_more is true
+  async getChanges(since?: string | null): Promise<SyncChanges> {
+    const response = await apiClient.get<SyncChanges>('/api/sync', {
+      params: since ? { since } : undefined
+    })
+    return response.data
+  }
+}
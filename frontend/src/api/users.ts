@@ -79,11 +79,31 @@ export const usersApi = {
     return response.data
   },
 
+  async deletePushSubscription(endpoint: string) {
+    const response = await apiClient.delete('/api/users/push-subscription', {
+      data: { endpoint }
+    })
+    return response.data
+  },
+
   async disconnectPartner() {
     const response = await apiClient.delete('/api/users/partner/disconnect')
     return response.data
   },
 
+  async exportArchive(): Promise<Blob> {
+    const response = await apiClient.get('/api/export', { responseType: 'blob' })
+    return response.data
+  },
+
+  // Diaries as NDJSON or an export ZIP; progress arrives as import.progress events
+  async importArchive(file: File) {
+    const formData = new FormData()
+    formData.append('file', file)
+    const response = await apiClient.post('/api/import', formData)
+    return response.data
+  },
+
   async deleteAccount() {
     const response = await apiClient.delete('/api/users/account')
     return response.data